@@ -5,6 +5,7 @@ from imgui.integrations.glfw import GlfwRenderer
 from objects.molecule import Molecule
 from app.object_factory import ATOM_FACTORY, MOLECULE_FACTORY, MOLECULE_DICT, ATOM_DICT
 from lib.molecule_recipes import recipes
+from lib.state import GL_STATE
 import glfw
 
 
@@ -23,6 +24,7 @@ class GUI:
     def end_frame(self):
         imgui.render()
         self.impl.render(imgui.get_draw_data())
+        GL_STATE.invalidate()  # the imgui renderer binds programs, VAOs and textures directly
 
     def render_menu_bar(self, viewer):
         # fmt: off
@@ -39,6 +41,7 @@ class GUI:
                 else:
                     _, self.show_atom_info = imgui.menu_item("Atom Info Pnael", None, self.show_atom_info)
                     _, self.show_periodic_table = imgui.menu_item("Periodic Table Selection", None, self.show_periodic_table)
+                _, viewer.on_demand = imgui.menu_item("Redraw on demand", None, viewer.on_demand)
                 imgui.end_menu()
 
             if imgui.begin_menu("Mode", True):
@@ -22,10 +22,12 @@ class InputHandler:
         glfw.set_char_callback(window, self.on_char)
 
     def on_char(self, win, char):
+        self.viewer.request_redraw()  # the frame shows the input, or imgui reacting to it
         self.viewer.gui.impl.char_callback(win, char)
 
     def on_key(self, win, key, scancode, action, mods):
         # fmt: off
+        self.viewer.request_redraw()
         self.viewer.gui.impl.keyboard_callback(win, key, scancode, action, mods)
 
         io = imgui.get_io()
@@ -62,6 +64,7 @@ class InputHandler:
                 return
 
     def on_mouse_button(self, win, button, action, mods):
+        self.viewer.request_redraw()
         self.viewer.gui.impl.mouse_callback(win, button, action, mods)
 
         io = imgui.get_io()
@@ -77,6 +80,7 @@ class InputHandler:
             self._dragging = False
 
     def on_mouse_move(self, win, x, y):
+        self.viewer.request_redraw()
         io = imgui.get_io()
         if io.want_capture_mouse:
             return
@@ -96,6 +100,7 @@ class InputHandler:
             )
 
     def on_mouse_scroll(self, win, xoff, yoff):
+        self.viewer.request_redraw()
         self.viewer.gui.impl.scroll_callback(win, xoff, yoff)
 
         io = imgui.get_io()
@@ -17,9 +17,13 @@ class SceneManager:
         self.current_molecule = Molecule.build_from_recipe(
             recipes[self.current_molecule_name]
         )
+        self.revision = 0  # bumped on every change the viewer has to redraw for
 
     def set_current_atom(self, obj):
+        if self.current_atom is not None and self.current_atom is not obj:
+            self.current_atom.destroy()  # its buffers would otherwise outlive it
         self.current_atom = obj
+        self.revision += 1
 
     def get_current_atom(self):
         return self.current_atom
@@ -29,6 +33,7 @@ class SceneManager:
 
     def set_current_molecule(self, obj):
         self.current_molecule = obj
+        self.revision += 1
 
     def get_current_molecule(self):
         return self.current_molecule
@@ -38,6 +43,7 @@ class SceneManager:
 
     def set_current_molecule_name(self, name):
         self.current_molecule.name = name
+        self.revision += 1
 
     def draw(self, projection, view, model, rendering_mode):
         if rendering_mode == "atom" and self.current_atom:
@@ -1,3 +1,27 @@
 import os
+import numpy as np
 
+# fmt: off
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+GLOBAL_LIGHT_POS = np.array([30.0, 30.0, 30.0], dtype=np.float32)
+GLOBAL_I_LIGHT = np.array([[0.9, 0.9, 0.9],   # diffuse 
+                           [0.9, 0.9, 0.9],   # specular 
+                           [0.05, 0.05, 0.05]],  # ambient 
+                           dtype=np.float32,
+)
+GLOBAL_SHININESS = 20.0
+GLOBAL_K_MATERIALS = np.array([[0.9, 0.9, 0.9],   # diffuse 
+                               [0.8, 0.8, 0.8],   # specular 
+                               [0.1, 0.1, 0.1]],  # ambient 
+                               dtype=np.float32)
+
+# linked programs saved with glGetProgramBinary, keyed by their sources and the GL driver
+SHADER_BINARY_CACHE = True
+SHADER_CACHE_DIR = os.path.join(PROJECT_ROOT, ".shader_cache")
+
+# redraw policy of Viewer.run
+ON_DEMAND_REDRAW = True  # sleep in glfw.wait_events_timeout until something needs a new frame
+MAX_FPS = 60             # frame-rate cap, reached while something animates
+IDLE_TIMEOUT = 0.5       # seconds an idle window sleeps between wake-ups
+REDRAW_FRAMES = 2        # frames drawn per request, imgui shows hover / click state one frame late
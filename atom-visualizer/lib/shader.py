@@ -1,15 +1,23 @@
 import OpenGL.GL as GL  # standard Python OpenGL wrapper
 import numpy as np
-import pandas as pd
+import hashlib
+import glob
 import sys
 import os
+import time
 
-from .config import PROJECT_ROOT
+from .config import PROJECT_ROOT, SHADER_BINARY_CACHE, SHADER_CACHE_DIR
+from .state import GL_STATE
+
+# uniform block shared by every program, see FrameUBO in lib/buffer.py
+FRAME_BLOCK_NAME = "FrameData"
+FRAME_BLOCK_BINDING = 0
 
 
 class Shader:
     """Helper class to create and automatically destroy shader program"""
 
+
     def __init__(self, shader_type: str):
         # fmt: off
         """Shader can be initialized with raw strings or source file names"""
@@ -22,11 +30,25 @@ class Shader:
         else:
             raise ValueError(f"Unknown shader type: {shader_type}")
 
+        self.shader_type = shader_type.lower()
         self.render_idx = None
-        vert = self._compile_shader(vertex_source, GL.GL_VERTEX_SHADER)
-        frag = self._compile_shader(fragment_source, GL.GL_FRAGMENT_SHADER)
+        self.uniforms = {}
+        start = time.perf_counter()
+        sources = [self._read_source(vertex_source), self._read_source(fragment_source)]
+        self.render_idx = PROGRAM_CACHE.load(self.shader_type, sources)
+        self.from_cache = self.render_idx is not None
+        if self.from_cache:
+            self.uniforms = self._query_uniforms()
+            self._bind_uniform_blocks()
+            self.compile_time = time.perf_counter() - start
+            return
+
+        vert = self._compile_shader(sources[0], GL.GL_VERTEX_SHADER)
+        frag = self._compile_shader(sources[1], GL.GL_FRAGMENT_SHADER)
         if vert and frag:
             self.render_idx = GL.glCreateProgram()  # pylint: disable=E1111
+            if PROGRAM_CACHE.enabled():
+                GL.glProgramParameteri(self.render_idx, GL.GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL.GL_TRUE)
             GL.glAttachShader(self.render_idx, vert)
             GL.glAttachShader(self.render_idx, frag)
             GL.glLinkProgram(self.render_idx)
@@ -36,25 +58,59 @@ class Shader:
             if not status:
                 print(GL.glGetProgramInfoLog(self.render_idx).decode("ascii"))
                 sys.exit(1)
+            PROGRAM_CACHE.save(self.shader_type, sources, self.render_idx)
+            self.uniforms = self._query_uniforms()
+            self._bind_uniform_blocks()
+        self.compile_time = time.perf_counter() - start
+
+    def _query_uniforms(self):
+        """Resolve the location of every active uniform once, right after linking"""
+        uniforms = {}
+        count = GL.glGetProgramiv(self.render_idx, GL.GL_ACTIVE_UNIFORMS)
+        for index in range(count):
+            name, _, _ = GL.glGetActiveUniform(self.render_idx, index)
+            name = name.decode("ascii") if isinstance(name, bytes) else str(name)
+            location = GL.glGetUniformLocation(self.render_idx, name)
+            uniforms[name] = location
+            if name.endswith("[0]"):  # arrays are reported as "name[0]"
+                uniforms[name[:-3]] = location
+        return uniforms
+
+    def _bind_uniform_blocks(self):
+        block_index = GL.glGetUniformBlockIndex(self.render_idx, FRAME_BLOCK_NAME)
+        if block_index != GL.GL_INVALID_INDEX:
+            GL.glUniformBlockBinding(self.render_idx, block_index, FRAME_BLOCK_BINDING)
+
+    def use(self):
+        """Bind this program, skipping glUseProgram if it is already bound"""
+        GL_STATE.use_program(self.render_idx)
+
+    @staticmethod
+    def unbind():
+        GL_STATE.use_program(0)
 
     def __del__(self):
-        GL.glUseProgram(0)
+        Shader.unbind()
         if self.render_idx:  # if this is a valid shader object
             GL.glDeleteProgram(self.render_idx)  # object dies => destroy GL object
 
     @staticmethod
-    def _compile_shader(src, shader_type):
+    def _read_source(src):
+        """GLSL text of a shader file, or 'src' itself if it is no file"""
         shader_path = os.path.join(PROJECT_ROOT, src)
         # print(
-        #     "[INFO::lib.shader.Shader._compile_shader] reading shader from", shader_path
+        #     "[INFO::lib.shader.Shader._read_source] reading shader from", shader_path
         # )
         if os.path.exists(shader_path):
             src = open(shader_path, "r").read()
         else:
             print(
-                "[ERROR::lib.shader.Shader._compile_shader] Shader source not found, using string as source"
+                "[ERROR::lib.shader.Shader._read_source] Shader source not found, using string as source"
             )
-        src = src.decode("ascii") if isinstance(src, bytes) else src
+        return src.decode("ascii") if isinstance(src, bytes) else src
+
+    @staticmethod
+    def _compile_shader(src, shader_type):
         shader = GL.glCreateShader(shader_type)
         GL.glShaderSource(shader, src)
         GL.glCompileShader(shader)
@@ -71,8 +127,148 @@ class Shader:
     def destroy(self):
         try:
             if getattr(self, "render_idx", None):
-                GL.glUseProgram(0)
+                Shader.unbind()
                 GL.glDeleteProgram(self.render_idx)
                 self.render_idx = None
         except Exception:
             pass
+
+
+class ProgramBinaryCache:
+    """
+    Linked programs on disk, one file per shader type named after a hash of its GLSL
+    sources and the GL vendor, renderer and version strings. Editing a source or
+    updating the driver changes the hash, so the old file is never loaded again and is
+    replaced on the next save; a binary the driver rejects falls back to compiling.
+    """
+
+    VERSION = 1  # of the file layout: uint32 binary format, then the binary
+
+    def __init__(self, directory=SHADER_CACHE_DIR):
+        self.directory = directory
+        self.driver = None  # vendor, renderer and version, read once a context exists
+        self.supported = None
+
+    def enabled(self):
+        if self.supported is None:
+            self.supported = False
+            try:
+                self.supported = SHADER_BINARY_CACHE and bool(GL.glProgramBinary) and (
+                    GL.glGetIntegerv(GL.GL_NUM_PROGRAM_BINARY_FORMATS) > 0
+                )
+                strings = [GL.glGetString(name) for name in (GL.GL_VENDOR, GL.GL_RENDERER, GL.GL_VERSION)]
+                self.driver = "\n".join(s.decode("ascii", "replace") if s else "" for s in strings)
+            except Exception:  # no glProgramBinary entry point (pre 4.1 without ARB_get_program_binary)
+                self.supported = False
+        return self.supported
+
+    def path(self, shader_type, sources):
+        digest = hashlib.sha256()
+        for part in [str(self.VERSION), self.driver] + list(sources):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return os.path.join(self.directory, "%s-%s.bin" % (shader_type, digest.hexdigest()[:32]))
+
+    def load(self, shader_type, sources):
+        """Linked program for the sources from its cached binary, None on a miss"""
+        if not self.enabled():
+            return None
+        path = self.path(shader_type, sources)
+        if not os.path.exists(path):
+            return None
+        program = None
+        try:
+            data = np.fromfile(path, dtype=np.uint8)
+            if len(data) <= 4:
+                return None
+            binary_format = int(data[:4].view(np.uint32)[0])
+            binary = np.ascontiguousarray(data[4:])
+            program = GL.glCreateProgram()  # pylint: disable=E1111
+            GL.glProgramBinary(program, binary_format, binary, len(binary))
+            if GL.glGetProgramiv(program, GL.GL_LINK_STATUS):
+                return program
+        except Exception:  # unreadable file or a format this driver no longer accepts
+            pass
+        if program:
+            GL.glDeleteProgram(program)  # compiled from source and overwritten instead
+        return None
+
+    def save(self, shader_type, sources, program):
+        if not self.enabled():
+            return
+        try:
+            length = GL.glGetProgramiv(program, GL.GL_PROGRAM_BINARY_LENGTH)
+            if length <= 0:
+                return
+            binary = np.empty(length, dtype=np.uint8)
+            written = np.zeros(1, dtype=np.int32)
+            binary_format = np.zeros(1, dtype=np.uint32)
+            GL.glGetProgramBinary(program, length, written, binary_format, binary)
+
+            os.makedirs(self.directory, exist_ok=True)
+            path = self.path(shader_type, sources)
+            for stale in glob.glob(os.path.join(self.directory, shader_type + "-*.bin")):
+                if stale != path:
+                    os.remove(stale)
+            with open(path + ".tmp", "wb") as f:  # rename, so a crash never leaves half a file
+                f.write(binary_format.tobytes())
+                f.write(binary[: int(written[0])].tobytes())
+            os.replace(path + ".tmp", path)
+        except Exception as e:  # the program works all the same, it is compiled again next launch
+            print("[ERROR::lib.shader.ProgramBinaryCache] could not cache %s: %s" % (shader_type, e))
+
+
+PROGRAM_CACHE = ProgramBinaryCache()
+
+
+class ShaderRegistry:
+    """Process-wide cache of shader programs, compiled once per shader type and reference-counted"""
+
+    def __init__(self):
+        self.programs = {}  # shader_type -> Shader
+        self.refcounts = {}  # shader_type -> number of owners
+        self.compile_count = 0
+        self.cache_hits = 0  # programs loaded from PROGRAM_CACHE instead of compiled
+        self.compile_time = 0.0
+
+    def acquire(self, shader_type: str) -> Shader:
+        key = shader_type.lower()
+        shader = self.programs.get(key)
+        if shader is None:
+            shader = Shader(key)
+            self.programs[key] = shader
+            self.refcounts[key] = 0
+            self.compile_count += 1
+            self.cache_hits += shader.from_cache
+            self.compile_time += shader.compile_time
+        self.refcounts[key] += 1
+        return shader
+
+    def release(self, shader: Shader):
+        key = shader.shader_type
+        if self.programs.get(key) is not shader:
+            return
+        self.refcounts[key] -= 1
+        if self.refcounts[key] <= 0:
+            del self.programs[key]
+            del self.refcounts[key]
+            shader.destroy()
+
+    def stats(self):
+        return {
+            "programs": len(self.programs),
+            "references": sum(self.refcounts.values()),
+            "compile_count": self.compile_count,
+            "cache_hits": self.cache_hits,
+            "compile_time_ms": self.compile_time * 1000.0,
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(
+            "[INFO::lib.shader.ShaderRegistry] %d program(s) live, %d reference(s), %d compile(s) (%d from binary cache) in %.1f ms"
+            % (stats["programs"], stats["references"], stats["compile_count"], stats["cache_hits"], stats["compile_time_ms"])
+        )
+
+
+SHADER_REGISTRY = ShaderRegistry()
@@ -1,3 +1,5 @@
+from lib.startup import STARTUP  # first, so the startup report covers every import
+
 import os
 
 # os.environ["GDK_BACKEND"] = "x11"
@@ -7,6 +9,8 @@ from objects.atom import Atom
 from objects.colors import Color
 from objects import Circle
 
+STARTUP.mark("imports")
+
 
 def main():
     """create windows, add shaders & scene objects, then run rendering loop"""
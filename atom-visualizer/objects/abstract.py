@@ -1,67 +1,61 @@
+import copy
 import ctypes
 import numpy as np
-from lib.transform import identity
-from lib.buffer import UManager, VAO
-from lib.shader import Shader
+from lib.transform import identity, normal_matrix
+from lib.buffer import GEOMETRY_CACHE, UManager, VAO
+from lib.shader import Shader, SHADER_REGISTRY
 import OpenGL.GL as GL
 from objects.colors import Color
 
 
+def _cache_key(value):
+    """
+    Hashable stand-in for constructor arguments, equal only for equal values: arrays by dtype,
+    shape and bytes (their repr elides the middle), lists, tuples and dicts element-wise;
+    TypeError for anything else unhashable
+    """
+    if isinstance(value, np.ndarray):
+        return ("ndarray", value.dtype.str, value.shape, value.tobytes())
+    if isinstance(value, (list, tuple)):
+        return tuple(_cache_key(item) for item in value)
+    if isinstance(value, dict):
+        items = sorted(value.items(), key=lambda item: repr(item[0]))
+        return ("dict",) + tuple((_cache_key(name), _cache_key(item)) for name, item in items)
+    hash(value)
+    return value
+
+
 class Drawable:
+    # vertex formats per attribute location (position, color, normal):
+    # 36 bytes/vertex in full precision, 16 bytes/vertex compact
+    FORMATS = {0: "float3", 1: "float3", 2: "float3"}
+    COMPACT_FORMATS = {0: "half4", 1: "ubyte4", 2: "int_2_10_10_10_rev"}
+
     def __init__(self, shader_type: str):
         self.name = None
 
         self.vertices: np.ndarray = None
         self.normals: np.ndarray = None
         self.indices: np.ndarray = None
-        self.colors = np.ndarray = None
+        self.colors: np.ndarray = None
 
         self.rendering_mode = "phong"
 
         self.vao: VAO = VAO()
-        self.shader: Shader = Shader(shader_type)
+        self.shader: Shader = SHADER_REGISTRY.acquire(shader_type)
         self.uma: UManager = UManager(self.shader)
 
         self.transform = identity()
+        self.geometry_key = None  # set on drawables handed out by shared()
 
-    def setup(self):
+    def setup(self, compact=False):
         # fmt: off
-        self.vao.add_vbo(0, self.vertices, ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None,)
-        self.vao.add_vbo(1, self.colors, ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None,)
-        self.vao.add_vbo(2, self.normals, ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None,)
+        formats = self.COMPACT_FORMATS if compact else self.FORMATS
+        self.vao.add_interleaved({0: self.vertices, 1: self.colors, 2: self.normals}, formats)
         if self.indices is not None:
             self.vao.add_ebo(self.indices)
 
-        # Light
-        I_light = np.array(
-            [
-                [0.9, 0.9, 0.9],  # diffuse 
-                [0.9, 0.9, 0.9],  # specular 
-                [0.05, 0.05, 0.05],  # ambient 
-            ],
-            dtype=np.float32,
-        )
-        light_pos = np.array([30.0, 30.0, 30.0], dtype=np.float32)
-
-        shininess = 20.0
-        mode = 1
-
-        # Materials
-        K_materials = np.array(
-            [
-                [0.9, 0.9, 0.9],  # diffuse
-                [0.8, 0.8, 0.8],  # specular
-                [0.1, 0.1, 0.1],  # ambient
-            ],
-            dtype=np.float32,
-        )
-
-        GL.glUseProgram(self.shader.render_idx)
-        self.uma.upload_uniform_matrix3fv(I_light, "I_light", False)
-        self.uma.upload_uniform_vector3fv(light_pos, "light_pos")
-        self.uma.upload_uniform_matrix3fv(K_materials, "K_materials", False)
-        self.uma.upload_uniform_scalar1f(shininess, "shininess")
-        self.uma.upload_uniform_scalar1i(mode, "mode")
+        # camera and light uniforms live in the per-frame FrameUBO
         return self
 
     def draw(
@@ -73,25 +67,48 @@ class Drawable:
         mode=GL.GL_TRIANGLES,
         begin=0,
         num=0,
+        instances=None,
     ):
         # fmt: off
-        modelview = view @ model @ self.transform
-
-        light_pos = np.array([30.0, 30.0, 30.0], dtype=np.float32)
-
-        self.uma.upload_uniform_matrix4fv(projection, "projection", True)
-        self.uma.upload_uniform_matrix4fv(modelview, "modelview", True)
-        light_pos_eye4 = view @ np.array([light_pos[0], light_pos[1], light_pos[2], 1.0], dtype=np.float32)
-        self.uma.upload_uniform_vector3fv(light_pos_eye4[:3], "light_pos")
+        model = model @ self.transform
+        self.shader.use()
+        self.uma.upload_uniform_matrix4fv(model, "model", True)
+        if self.uma.get_uniform_location("normal_matrix") >= 0:
+            self.uma.upload_uniform_matrix3fv(normal_matrix(view @ model), "normal_matrix", True)
 
         self.vao.activate()
-        if use_ebo:
+        if instances is not None:  # per-instance attributes set up by the caller
+            if use_ebo:
+                GL.glDrawElementsInstanced(mode, int(self.indices.size), GL.GL_UNSIGNED_INT, ctypes.c_voidp(0), instances)
+            else:
+                GL.glDrawArraysInstanced(mode, begin, num, instances)
+        elif use_ebo:
             GL.glDrawElements(mode, int(self.indices.size), GL.GL_UNSIGNED_INT, ctypes.c_voidp(0))
         else:
             GL.glDrawArrays(mode, begin, num)
 
-        self.vao.deactivate()
+    @classmethod
+    def shared(cls, *args, compact=False, **kwargs):
+        """
+        Set-up drawable whose VAO is shared with every other cls(*args, **kwargs) from
+        shared(); the buffers are freed when the last of them is destroyed. 'compact' is
+        passed on to setup(); arguments without a hashable form get a drawable of their own
+        """
+        try:
+            key = _cache_key((cls, args, kwargs, compact))
+        except TypeError:
+            return cls(*args, **kwargs).setup(compact=compact)
+        prototype = GEOMETRY_CACHE.acquire(key, lambda: cls(*args, **kwargs).setup(compact=compact))
+        drawable = copy.copy(prototype)  # own per-object state, same geometry and VAO
+        drawable.shader = SHADER_REGISTRY.acquire(prototype.shader.shader_type)
+        drawable.uma = UManager(drawable.shader)  # no textures of the prototype
+        drawable.transform = prototype.transform.copy()
+        drawable.geometry_key = key
+        return drawable
 
     def destroy(self):
-        self.vao.destroy()
-        self.shader.destroy()
+        if self.geometry_key is not None:
+            GEOMETRY_CACHE.release(self.geometry_key)
+        else:
+            self.vao.destroy()
+        SHADER_REGISTRY.release(self.shader)
@@ -1,6 +1,6 @@
 from objects import Sphere, Drawable, Circle
 from objects.colors import Color
-from lib.transform import translate
+from lib.buffer import RingBuffer
 
 import numpy as np
 
@@ -26,6 +26,20 @@ class Atom(Drawable):
         self.electron = Sphere("phong", Color.BLUE, 0.1, 32).setup()
         self.distribute_e()
 
+        # orbit rings are static, build them once instead of every frame
+        self.orbits = [
+            Circle("gouraud", self.bohr_radius + shell_idx * self.radius_increment, 64).setup()
+            for shell_idx in range(len(self.electron_positions))
+        ]
+
+        # all electrons drawn as instances of one sphere, their offsets streamed per frame
+        self.electron_rest = np.vstack(self.electron_positions).astype(np.float32)
+        self.electron_speed = np.concatenate(
+            [np.full(len(positions), 1 / (shell_idx + 1)) for shell_idx, positions in enumerate(self.electron_positions)]
+        )
+        self.electron_offsets = np.zeros_like(self.electron_rest)
+        self.electron_stream = RingBuffer(self.electron_rest.nbytes)
+
     def setup(self):
         return self
 
@@ -35,20 +49,27 @@ class Atom(Drawable):
 
         self.atom.draw(projection, view, model)
 
-        for shell_idx, positions in enumerate(self.electron_positions):
-            radius = self.bohr_radius + shell_idx * self.radius_increment
-            Circle("gouraud", radius, 64).setup().draw(projection, view, model)
-
-            angular_velocity = 1/(shell_idx+1)
-            rotation_angle = self._time*angular_velocity
-            cos_angle, sin_angle = np.cos(rotation_angle), np.sin(rotation_angle)
-
-            for pos in positions:
-                x_rotated = pos[0]*cos_angle - pos[1]*sin_angle
-                y_rotated = pos[0]*sin_angle + pos[1]*cos_angle
-
-                e_model = model @ translate(x_rotated, y_rotated, 0)
-                self.electron.draw(projection, view, e_model)
+        for orbit in self.orbits:
+            orbit.draw(projection, view, model)
+
+        # each shell rotates at 1/(shell_idx+1) rad per time unit
+        rotation_angle = self._time*self.electron_speed
+        cos_angle, sin_angle = np.cos(rotation_angle), np.sin(rotation_angle)
+        x, y = self.electron_rest[:, 0], self.electron_rest[:, 1]
+        self.electron_offsets[:, 0] = x*cos_angle - y*sin_angle
+        self.electron_offsets[:, 1] = x*sin_angle + y*cos_angle
+
+        region = self.electron_stream.write(self.electron_offsets)
+        self.electron.vao.set_instance_attribute(3, self.electron_stream.buffer, region)
+        self.electron.draw(projection, view, model, instances=len(self.electron_offsets))
+        self.electron_stream.fence()
+
+    def destroy(self):
+        self.atom.destroy()
+        self.electron.destroy()
+        for orbit in self.orbits:
+            orbit.destroy()
+        self.electron_stream.destroy()
 
     def distribute_e(self):
         from pprint import pprint
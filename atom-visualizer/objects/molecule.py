@@ -75,9 +75,9 @@ class Molecule(Drawable):
         child_pos = bond_vector * bond_length
         child.atom.transform = translate(*child_pos) @ child.atom.transform
 
-        bond = Bond(
+        bond = Bond.shared(
             radius=bond_radius, height=bond_length, bond_count=bond_count
-        ).setup()
+        )
 
         y_axis = np.array([0, 1, 0])
         axis = np.cross(y_axis, bond_vector)
@@ -100,11 +100,11 @@ class Molecule(Drawable):
     @classmethod
     def build_from_recipe(cls, recipe):
         atom_recipe = recipe["atom"]
-        atom = Sphere(
+        atom = Sphere.shared(
             radius=atom_recipe["radius"],
             color=ATOM_COLOR.get(atom_recipe["symbol"], Color.GRAY),
             name=atom_recipe["symbol"],
-        ).setup()
+        )
         # print("Building atom:", atom_recipe["symbol"])
 
         molecule = cls(atom, recipe["bonding_type"], name=atom_recipe["symbol"])
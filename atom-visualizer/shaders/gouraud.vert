@@ -4,11 +4,20 @@
 layout(location = 0) in vec3 position;
 layout(location = 1) in vec3 color;
 
-uniform mat4 projection, modelview;
+// per-frame camera and light data, written once per frame by the viewer
+layout(std140) uniform FrameData {
+  mat4 projection;
+  mat4 view;
+  vec3 light_pos;  // eye space
+  float shininess;
+  mat3 I_light;
+  mat3 K_materials;
+};
+uniform mat4 model;
 out vec3 colorInterp;
 
 out vec3 fragment_color;
 void main(){
     colorInterp = color;
-    gl_Position = projection * modelview * vec4(position, 1.0);;
+    gl_Position = projection * view * model * vec4(position, 1.0);
 }
@@ -4,7 +4,18 @@
 layout(location = 0) in vec3 position;
 layout(location = 1) in vec3 color;
 layout(location = 2) in vec3 normal;
-uniform mat4 projection, modelview;
+layout(location = 3) in vec3 instance_offset;  // per-instance model-space offset, (0, 0, 0) when not streamed
+// per-frame camera and light data, written once per frame by the viewer
+layout(std140) uniform FrameData {
+  mat4 projection;
+  mat4 view;
+  vec3 light_pos;  // eye space
+  float shininess;
+  mat3 I_light;
+  mat3 K_materials;
+};
+uniform mat4 model;
+uniform mat3 normal_matrix;  // inverse-transpose of mat3(view * model), computed on the CPU
 out vec3 normal_interp;
 out vec3 vertPos;
 out vec3 colorInterp;
@@ -13,11 +24,11 @@ out vec3 colorInterp;
 
 void main(){
   colorInterp = color;
-  vec4 vertPos4 = modelview * vec4(position, 1.0);
+  mat4 modelview = view * model;
+  vec4 vertPos4 = modelview * vec4(position + instance_offset, 1.0);
   vertPos = vec3(vertPos4) / vertPos4.w;
 
-  mat4 normal_matrix = transpose(inverse(modelview));
-  normal_interp = vec3(normal_matrix * vec4(normal, 0.0));
+  normal_interp = normal_matrix * normal;
 
   gl_Position = projection * vertPos4;
 }
@@ -2,7 +2,8 @@ import numpy as np
 import OpenGL.GL as GL
 from objects.abstract import Drawable
 from lib.buffer import VAO, UManager
-from lib.shader import Shader
+from lib.shader import SHADER_REGISTRY
+from lib.state import GL_STATE
 
 
 class Grid(Drawable):
@@ -21,7 +22,7 @@ class Grid(Drawable):
         self.vertices, self.colors = self._generate_grid_vertices()
 
         self.vao = VAO()
-        self.shader = Shader(shader_type)
+        self.shader = SHADER_REGISTRY.acquire(shader_type)
         self.uma = UManager(self.shader)
 
     def setup(self):
@@ -32,48 +33,16 @@ class Grid(Drawable):
         if self.indices is not None:
             self.vao.add_ebo(self.indices)
 
-        # Light
-        I_light = np.array(
-            [
-                [0.9, 0.4, 0.6],  # diffuse
-                [0.9, 0.4, 0.6],  # specular
-                [0.9, 0.4, 0.6],  # ambient
-            ],
-            dtype=np.float32,
-        )
-        light_pos = np.array([0, 0.5, 0.9], dtype=np.float32)
-
-        shininess = 100.0
-        mode = 1
-
-        # Materials
-        K_materials = np.array(
-            [
-                [0.6, 0.4, 0.7],  # diffuse
-                [0.6, 0.4, 0.7],  # specular
-                [0.6, 0.4, 0.7],  # ambient
-            ],
-            dtype=np.float32,
-        )
-
-        GL.glUseProgram(self.shader.render_idx)
-        self.uma.upload_uniform_matrix3fv(I_light, "I_light", False)
-        self.uma.upload_uniform_vector3fv(light_pos, "light_pos")
-        self.uma.upload_uniform_matrix3fv(K_materials, "K_materials", False)
-        self.uma.upload_uniform_scalar1f(shininess, "shininess")
-        self.uma.upload_uniform_scalar1i(mode, "mode")
         return self
 
     def draw(self, projection, view, model):
-        GL.glUseProgram(self.shader.render_idx)
-
-        modelview = view @ model
-        self.uma.upload_uniform_matrix4fv(projection, "projection", True)
-        self.uma.upload_uniform_matrix4fv(modelview, "modelview", True)
+        self.shader.use()
+        self.uma.upload_uniform_scalar1i(0, "instanced")  # the program is shared with instanced drawables
+        self.uma.upload_uniform_matrix4fv(model, "model", True)
 
         self.vao.activate()
+        GL_STATE.set_cull_face(self.culling)  # no effect on lines, but keeps the tracked state in step
         GL.glDrawArrays(GL.GL_LINES, 0, len(self.vertices))
-        self.vao.deactivate()
 
     def _generate_grid_vertices(self):
         vertices = []
@@ -8,9 +8,11 @@ from imgui.integrations.glfw import GlfwRenderer
 import glfw
 import numpy as np
 import OpenGL.GL as GL
-from tkinter import Tk, filedialog
 
 from app.object_factory import OBJECT_FACTORY, OBJECT_CATEGORIES
+from lib.shader import SHADER_REGISTRY
+from lib.buffer import GEOMETRY_CACHE
+from lib.state import GL_STATE
 
 
 class GUI:
@@ -30,6 +32,7 @@ class GUI:
     def end_frame(self):
         imgui.render()
         self.impl.render(imgui.get_draw_data())
+        GL_STATE.invalidate()  # the imgui renderer binds programs, VAOs and textures directly
 
     def render_menu_bar(self, viewer):
         # fmt: off
@@ -44,6 +47,7 @@ class GUI:
                 _, self.show_scene_panel = imgui.menu_item("Object List Panel", None, self.show_scene_panel)
                 _, self.show_info_panel = imgui.menu_item("Infomation Panel", None, self.show_info_panel)
                 _, viewer.display_grid = imgui.menu_item("World grid", None, viewer.display_grid)
+                _, viewer.on_demand = imgui.menu_item("Redraw on demand", None, viewer.on_demand)
                 imgui.end_menu()
 
             if imgui.begin_menu("Rendering", True):
@@ -59,6 +63,13 @@ class GUI:
                     viewer.rendering_mode = "texture"
                 imgui.end_menu()
 
+            if imgui.begin_menu("Selection", True):
+                if imgui.menu_item("Ray cast picking", None, viewer.picking_mode == "ray")[0]:
+                    viewer.picking_mode = "ray"
+                if imgui.menu_item("GPU id buffer picking", None, viewer.picking_mode == "gpu")[0]:
+                    viewer.picking_mode = "gpu"
+                imgui.end_menu()
+
             imgui.end_main_menu_bar()
 
     def render_info_panel(self, viewer):
@@ -78,18 +89,30 @@ class GUI:
             imgui.text("LMB Drag: Rotate")
             imgui.text("Shift+LMB/RMB Drag: Pan")
             imgui.text("Mouse Scroll: Zoom In/Out")
+            imgui.text("LMB Click: Select object")
+            imgui.text("Ctrl+LMB Drag: Select objects in rectangle")
             imgui.text("M: Switch manipulation mode")
             imgui.text("Tab: Select next object")
             imgui.text("Shift+Tab: Select previous object")
             imgui.text("Delete: Delete selected object")
             imgui.separator()
+            shader_stats = SHADER_REGISTRY.stats()
+            imgui.text(f"Shaders: {shader_stats['compile_count']} built ({shader_stats['cache_hits']} cached) in {shader_stats['compile_time_ms']:.1f} ms")
+            geometry_stats = GEOMETRY_CACHE.stats()
+            imgui.text(f"Meshes: {geometry_stats['meshes']} uploaded for {geometry_stats['references']} objects")
+            cull_stats = viewer.scene.cull_stats
+            imgui.text(f"Objects: {cull_stats['drawn']} drawn, {cull_stats['culled']} culled")
+            queue_stats = viewer.scene.render_queue.stats
+            imgui.text(f"Draws: {queue_stats['submissions']}, state changes: {queue_stats['state_changes']}")
+            imgui.text(f"Binds saved: {queue_stats['binds_saved']} sorted, {queue_stats['binds_skipped']} redundant")
+            imgui.separator()
             if viewer.manipulation_mode == "camera":
                 imgui.text("Current Mode: Camera")
             else:
                 imgui.text("Current Mode: Object")
             if (
                 viewer.manipulation_mode == "object"
-                and viewer.scene.selected_index is not None
+                and viewer.scene.selected_handle is not None
             ):
                 imgui.text("Arrow Keys: Move on XZ plane")
                 imgui.text("E/Q: Move up/down")
@@ -98,6 +121,14 @@ class GUI:
 
         imgui.end()
 
+    def render_selection_rect(self, input_handler):
+        if input_handler.selection_rect is None:
+            return
+        x0, y0, x1, y1 = input_handler.selection_rect
+        draw_list = imgui.get_foreground_draw_list()
+        draw_list.add_rect_filled(x0, y0, x1, y1, imgui.get_color_u32_rgba(0.3, 0.6, 1.0, 0.15))
+        draw_list.add_rect(x0, y0, x1, y1, imgui.get_color_u32_rgba(0.3, 0.6, 1.0, 0.9))
+
     def render_scene_panel(self, scene_manager):
         if not self.show_scene_panel:
             return
@@ -111,21 +142,24 @@ class GUI:
 
         expanded, opened = imgui.begin("Object list", True, flags)
         if expanded:
-            for idx, obj in enumerate(scene_manager.objects):
-                is_selected = idx == scene_manager.selected_index
+            deleted = []  # removed after the loop, removal reorders the list
+            for handle, obj in scene_manager.objects.items():
+                is_selected = handle == scene_manager.selected_handle or obj.selected
 
                 label = f"{obj.name}"
 
-                if imgui.selectable(f"{label}###{idx}", is_selected)[0]:
-                    scene_manager.selected_index = idx
+                # handles stay the same while objects come and go, so they make stable ids
+                if imgui.selectable(f"{label}###{handle}", is_selected)[0]:
+                    scene_manager.select(handle)
 
                 # right-click context menu
-                if imgui.begin_popup_context_item(f"context_{idx}"):
+                if imgui.begin_popup_context_item(f"context_{handle}"):
                     imgui.text(f"'{obj.name}'")
                     imgui.separator()
                     if imgui.selectable("Delete")[0]:
-                        scene_manager.remove(idx)
+                        deleted.append(handle)
                     imgui.end_popup()
+            scene_manager.remove_many(deleted)
 
             imgui.separator()
 
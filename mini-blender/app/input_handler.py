@@ -2,6 +2,8 @@ import glfw
 import imgui
 import numpy as np
 
+CLICK_TOLERANCE = 3  # pixels the cursor may move between press and release of a click
+
 
 class InputHandler:
     """Handles all keyboard and mouse input for the viewer"""
@@ -11,6 +13,8 @@ class InputHandler:
         self._dragging = False
         self._panning = False
         self._last_pos = (0, 0)
+        self._press_pos = None  # where the left button went down, for click-to-select
+        self.selection_rect = None  # (x0, y0, x1, y1) window coordinates of a Ctrl+drag in progress
 
     def setup_callbacks(self, window):
         glfw.set_key_callback(window, self.on_key)
@@ -20,9 +24,11 @@ class InputHandler:
         glfw.set_char_callback(window, self.on_char)
 
     def on_char(self, win, char):
+        self.viewer.request_redraw()  # the frame shows the input, or imgui reacting to it
         self.viewer.gui.impl.char_callback(win, char)
 
     def on_key(self, win, key, scancode, action, mods):
+        self.viewer.request_redraw()
         self.viewer.gui.impl.keyboard_callback(win, key, scancode, action, mods)
 
         io = imgui.get_io()
@@ -75,8 +81,8 @@ class InputHandler:
 
             # delete selected object
             if key == glfw.KEY_DELETE and action == glfw.PRESS:
-                if self.viewer.scene.selected_index is not None:
-                    self.viewer.scene.remove(self.viewer.scene.selected_index)
+                if self.viewer.scene.selected_handle is not None:
+                    self.viewer.scene.remove(self.viewer.scene.selected_handle)
                     print("Object deleted")
                 return
 
@@ -104,6 +110,7 @@ class InputHandler:
                     print("Transform reset")
 
     def on_mouse_button(self, win, button, action, mods):
+        self.viewer.request_redraw()
         self.viewer.gui.impl.mouse_callback(win, button, action, mods)
 
         io = imgui.get_io()
@@ -112,9 +119,12 @@ class InputHandler:
 
         if action == glfw.PRESS:
             self._last_pos = glfw.get_cursor_pos(win)
-
+            if button == glfw.MOUSE_BUTTON_LEFT and (mods & glfw.MOD_CONTROL):
+                self.selection_rect = self._last_pos * 2  # rectangle selection
+                return
             if button == glfw.MOUSE_BUTTON_LEFT and not (mods & glfw.MOD_SHIFT):
-                self._dragging = True  # orbit
+                self._dragging = True  # orbit, or a click if the cursor does not move
+                self._press_pos = self._last_pos
             if button == glfw.MOUSE_BUTTON_RIGHT or (
                 button == glfw.MOUSE_BUTTON_LEFT and (mods & glfw.MOD_SHIFT)
             ):
@@ -122,12 +132,47 @@ class InputHandler:
         else:
             self._dragging = False
             self._panning = False
+            if button == glfw.MOUSE_BUTTON_LEFT and self.selection_rect is not None:
+                self.request_pick(win, *self.selection_rect)
+                self.selection_rect = None
+            if button == glfw.MOUSE_BUTTON_LEFT and self._press_pos is not None:
+                pos = glfw.get_cursor_pos(win)
+                if np.hypot(pos[0] - self._press_pos[0], pos[1] - self._press_pos[1]) <= CLICK_TOLERANCE:
+                    self.pick(win, pos)
+                self._press_pos = None
+
+    def pick(self, win, pos):
+        """Select the object under the cursor, or clear the selection on empty space"""
+        if self.viewer.picking_mode == "gpu":
+            self.request_pick(win, *pos, *pos)
+            return
+        # cursor positions are in window coordinates, the framebuffer may be larger on HiDPI
+        origin, direction = self.viewer.camera.cursor_ray(pos, glfw.get_window_size(win))
+        hit = self.viewer.scene.pick(origin, direction)
+        self.viewer.scene.select(hit[0] if hit else None)
+        selected = self.viewer.scene.get_selected()
+        if selected:
+            print(f"Selected: {selected.name}")
+
+    def request_pick(self, win, x0, y0, x1, y1):
+        """Ask the id buffer for the objects in a window-space rectangle, selected when it is read back"""
+        # window coordinates, top-left origin -> framebuffer pixels, bottom-left origin
+        sx, sy = np.divide(glfw.get_framebuffer_size(win), glfw.get_window_size(win))
+        height = glfw.get_framebuffer_size(win)[1]
+        left, right = sorted((x0 * sx, x1 * sx))
+        bottom, top = sorted((height - y0 * sy, height - y1 * sy))
+        self.viewer.picker.request(left, bottom, right - left + 1, top - bottom + 1)
 
     def on_mouse_move(self, win, x, y):
+        self.viewer.request_redraw()
         io = imgui.get_io()
         if io.want_capture_mouse:
             return
 
+        if self.selection_rect is not None:
+            self.selection_rect = self.selection_rect[:2] + (x, y)
+            return
+
         if not (self._dragging or self._panning):
             return
 
@@ -159,6 +204,7 @@ class InputHandler:
             )
 
     def on_mouse_scroll(self, win, xoff, yoff):
+        self.viewer.request_redraw()
         self.viewer.gui.impl.scroll_callback(win, xoff, yoff)
 
         io = imgui.get_io()
@@ -1,22 +1,23 @@
 from objects import *
 
+# identical primitives share their GPU buffers through GEOMETRY_CACHE
 OBJECT_FACTORY = {
-    "Triangle": lambda: Triangle().setup(),
-    "Rectangle": lambda: Rectangle().setup(),
-    "Pentagon": lambda: Pentagon().setup(),
-    "Hexagon": lambda: Hexagon().setup(),
-    "Circle": lambda: Circle().setup(),
-    "Ellipse": lambda: Ellipse().setup(),
-    "Trapezoid": lambda: Trapezoid().setup(),
-    "Star": lambda: Star().setup(),
-    "Arrow": lambda: Arrow().setup(),
-    "Cube": lambda: Cube().setup(),
-    "Sphere": lambda: Sphere().setup(),
-    "Cylinder": lambda: Cylinder().setup(),
-    "Cone": lambda: Cone().setup(),
-    "Tetrahedron": lambda: Tetrahedron().setup(),
-    "Torus": lambda: Torus().setup(),
-    "Prism": lambda: Cylinder(nsegments=3).setup(),
+    "Triangle": lambda: Triangle.shared(),
+    "Rectangle": lambda: Rectangle.shared(),
+    "Pentagon": lambda: Pentagon.shared(),
+    "Hexagon": lambda: Hexagon.shared(),
+    "Circle": lambda: Circle.shared(),
+    "Ellipse": lambda: Ellipse.shared(),
+    "Trapezoid": lambda: Trapezoid.shared(),
+    "Star": lambda: Star.shared(),
+    "Arrow": lambda: Arrow.shared(),
+    "Cube": lambda: Cube.shared(),
+    "Sphere": lambda: Sphere.shared(),
+    "Cylinder": lambda: Cylinder.shared(),
+    "Cone": lambda: Cone.shared(),
+    "Tetrahedron": lambda: Tetrahedron.shared(),
+    "Torus": lambda: Torus.shared(),
+    "Prism": lambda: Cylinder.shared(nsegments=3),
 }
 
 OBJECT_CATEGORIES = {
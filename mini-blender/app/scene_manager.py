@@ -1,110 +1,293 @@
 import OpenGL.GL as GL
 import numpy as np
-from lib.transform import Trackball, translate, rotate, scale, identity
+from lib.transform import Trackball, model_matrices
+from lib.state import GL_STATE
+from lib.render_queue import RenderQueue
+from lib.bounds import frustum_planes, transform_spheres, transform_boxes, spheres_in_frustum, boxes_in_frustum
+from lib.bvh import BVH
+from lib.slot_map import SlotMap
 from objects.abstract import Drawable
 
+INSTANCING_THRESHOLD = 2  # smallest group of identical objects worth an instanced draw
+INITIAL_CAPACITY = 64  # rows of the transform arrays, doubled when full
+
+DRAG_BALL = Trackball(distance=0)  # shared by SceneObject.drag
+
 
 class SceneObject:
-    """Wrapper for drawable objects with transformation state because I don't want to modify the original classes"""
+    """
+    Handle on one object of a SceneManager: the drawable and its flags live here, the
+    transform lives in the manager's arrays at row 'row' and is exposed through views
+    """
+
+    __slots__ = ("scene", "handle", "row", "drawable", "name", "visible", "selected", "bvh_item")
 
-    def __init__(self, drawable: Drawable, name: str = "Object"):
+    def __init__(self, scene, drawable: Drawable, name: str = "Object"):
+        self.scene = scene
+        self.handle = None  # stable id in SceneManager.objects, set by SceneManager.add
+        self.row = None  # dense index in SceneManager.objects and the transform arrays, moves on removals
         self.drawable = drawable
         self.name = name
 
-        self.position = np.array([0.0, 0.0, 0.0], dtype=np.float32)
-        self.scale_factor = np.array([1.0, 1.0, 1.0], dtype=np.float32)
-
         self.visible = True
         self.selected = False
 
-        self.trackball = Trackball(distance=0)
+        self.bvh_item = None  # leaf of this object in SceneManager.bvh
+
+    @property
+    def position(self):
+        return self.scene.positions[self.row]
+
+    @position.setter
+    def position(self, value):
+        self.scene.positions[self.row] = value
+        self.scene.transform_changed(self)
+
+    @property
+    def scale_factor(self):
+        return self.scene.scales[self.row]
+
+    @scale_factor.setter
+    def scale_factor(self, value):
+        self.scene.scales[self.row] = value
+        self.scene.transform_changed(self)
+
+    @property
+    def rotation(self):
+        """(w, x, y, z) quaternion"""
+        return self.scene.rotations[self.row]
+
+    @rotation.setter
+    def rotation(self, value):
+        self.scene.rotations[self.row] = value
+        self.scene.transform_changed(self)
 
     def get_model_matrix(self):
-        # order: TRS => Scale -> Rotate -> Translate
-        model = identity()
-        model = scale(*self.scale_factor) @ model
-        model = self.trackball.matrix() @ model
-        # model = rotate((0, 1, 0), self.rotation[0]) @ model  # yaw (Y)
-        # model = rotate((1, 0, 0), self.rotation[1]) @ model  # pitch (X)
-        # model = rotate((0, 0, 1), self.rotation[2]) @ model  # roll (Z)
-        model = translate(*self.position) @ model
-        return model
+        """float32 model matrix (order: TRS => Scale -> Rotate -> Translate); do not modify"""
+        return self.scene.model_matrices()[self.row]
+
+    def world_sphere(self):
+        """(center, radius) of the drawable's bounding sphere under the model matrix"""
+        center, radius = self.drawable.bounding_sphere
+        centers, radii = transform_spheres(self.get_model_matrix()[None], center[None], np.array([radius]))
+        return centers[0], radii[0]
+
+    def world_aabb(self):
+        """(min, max) world AABB enclosing the drawable's local AABB under the model matrix"""
+        box_min, box_max = self.drawable.aabb
+        box_mins, box_maxs = transform_boxes(self.get_model_matrix()[None], box_min[None], box_max[None])
+        return box_mins[0], box_maxs[0]
 
     def translate(self, dx, dy, dz):
-        self.position += np.array([dx, dy, dz], dtype=np.float32)
+        self.position = self.position + np.array([dx, dy, dz], dtype=np.float32)
 
     def drag(self, old_pos, new_pos, winsize):
-        self.trackball.drag(old_pos, new_pos, winsize)
+        # trackball maths on the stored quaternion, without a Trackball per object
+        DRAG_BALL.rotation = self.rotation.copy()
+        DRAG_BALL.drag(old_pos, new_pos, winsize)
+        self.rotation = DRAG_BALL.rotation
 
     def reset_transform(self):
-        self.position = np.array([0.0, 0.0, 0.0], dtype=np.float32)
-        self.trackball.rotation = np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32)
-        self.scale_factor = np.array([1.0, 1.0, 1.0], dtype=np.float32)
+        self.scene.positions[self.row] = 0.0
+        self.scene.rotations[self.row] = (1.0, 0.0, 0.0, 0.0)
+        self.scene.scales[self.row] = 1.0
+        self.scene.transform_changed(self)
 
 
 class SceneManager:
     """Manages all objects in the scene"""
 
     def __init__(self):
-        self.objects: list[SceneObject] = []
-        self.selected_index = None
+        # handle -> SceneObject; dense order doubles as the row order of the transform arrays
+        self.objects = SlotMap()
+        self.selected_handle = None
         self.curr_rendering_mode = "phong"
+        self.render_queue = RenderQueue()
+        self.cull_stats = {"drawn": 0, "culled": 0}
+        self.bvh = None  # over the world AABBs of self.objects, rebuilt lazily after add / remove
+        self.revision = 0  # bumped on every change the viewer has to redraw for
+
+        # transforms as structure of arrays, row i belonging to self.objects.values[i]
+        self.positions = np.zeros((INITIAL_CAPACITY, 3), dtype=np.float32)
+        self.rotations = np.zeros((INITIAL_CAPACITY, 4), dtype=np.float32)
+        self.scales = np.zeros((INITIAL_CAPACITY, 3), dtype=np.float32)
+        self.models = np.zeros((INITIAL_CAPACITY, 4, 4), dtype=np.float32)
+        self.dirty = np.zeros(INITIAL_CAPACITY, dtype=bool)  # rows whose model matrix is stale
+
+    def _reserve(self, count):
+        """Grow the transform arrays to hold at least 'count' rows"""
+        if count <= len(self.positions):
+            return
+        capacity = max(2 * len(self.positions), count)
+        for name in ("positions", "rotations", "scales", "models", "dirty"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+    def model_matrices(self):
+        """(n, 4, 4) float32 model matrices of all rows, the stale ones recomputed in one batch"""
+        count = len(self.objects)
+        stale = np.flatnonzero(self.dirty[:count])
+        if count and len(stale) == count:  # everything moved, e.g. a new scene: straight into the cache
+            model_matrices(self.positions[:count], self.rotations[:count], self.scales[:count], out=self.models[:count])
+        elif len(stale):
+            self.models[stale] = model_matrices(self.positions[stale], self.rotations[stale], self.scales[stale])
+        self.dirty[stale] = False
+        return self.models[:count]
+
+    def transform_changed(self, obj):
+        """Mark the model matrix of 'obj' stale and keep its BVH leaf fitted"""
+        self.dirty[obj.row] = True
+        self.revision += 1
+        if self.bvh is not None:
+            self.bvh.refit(obj.bvh_item, *obj.world_aabb())
 
     def add(self, drawable: Drawable, name: str = ""):
-        if name == "":
-            name = f"{drawable.__class__.__name__}_{len(self.objects)}"
-        scene_obj = SceneObject(drawable, name)
-        self.objects.append(scene_obj)
-        self.selected_index = len(self.objects) - 1
+        scene_obj = self.add_many([drawable], [name])[0]
+        self.selected_handle = scene_obj.handle
         return scene_obj
 
-    def remove(self, index: int):
-        if 0 <= index < len(self.objects):
-            obj = self.objects.pop(index)
+    def add_many(self, drawables, names=None):
+        """Add drawables at the origin in one go, returns their SceneObjects"""
+        names = names if names is not None else [""] * len(drawables)
+        first = len(self.objects)
+        self._reserve(first + len(drawables))
+        added = []
+        for drawable, name in zip(drawables, names):
+            if name == "":
+                name = f"{drawable.__class__.__name__}_{len(self.objects)}"
+            scene_obj = SceneObject(self, drawable, name)
+            scene_obj.row = len(self.objects)
+            scene_obj.handle = self.objects.insert(scene_obj)
+            added.append(scene_obj)
+
+        rows = slice(first, len(self.objects))
+        self.positions[rows] = 0.0
+        self.rotations[rows] = (1.0, 0.0, 0.0, 0.0)
+        self.scales[rows] = 1.0
+        self.dirty[rows] = True
+        self.bvh = None
+        self.revision += 1
+        return added
+
+    def remove(self, handle):
+        self.remove_many([handle])
+
+    def remove_many(self, handles):
+        """Remove the objects of the live handles among 'handles', stale ones are ignored"""
+        for handle in handles:
+            obj = self.objects.get(handle)
+            if obj is None:
+                continue
+            # the slot map moves its last object into the hole, the transform rows follow
+            last = len(self.objects) - 1
+            moved = self.objects.values[last]
+            self.objects.remove(handle)
+            if moved is not obj:
+                for array in (self.positions, self.rotations, self.scales, self.models, self.dirty):
+                    array[obj.row] = array[last]
+                moved.row = obj.row
+            obj.row = None
             if hasattr(obj.drawable, "destroy"):
                 obj.drawable.destroy()
-            if self.selected_index == index:
-                self.selected_index = None
-            elif self.selected_index is not None and self.selected_index > index:
-                self.selected_index -= 1
+            if self.selected_handle == handle:
+                self.selected_handle = None
+        self.bvh = None
+        self.revision += 1
 
     def clear(self):
         for obj in self.objects:
             if hasattr(obj.drawable, "destroy"):
                 obj.drawable.destroy()
         self.objects.clear()
-        self.selected_index = None
+        self.bvh = None
+        self.selected_handle = None
+        self.revision += 1
 
-    def select(self, index: int):
-        if self.selected_index is not None:
-            self.objects[self.selected_index].selected = False
+    def select(self, handle):
+        """Make 'handle' the only selected object, None (or a stale handle) clears the selection"""
+        for obj in self.objects:  # a rectangle selection may have flagged several
+            obj.selected = False
 
-        if 0 <= index < len(self.objects):
-            self.selected_index = index
-            self.objects[index].selected = True
-        else:
-            self.selected_index = None
+        obj = self.objects.get(handle)
+        self.selected_handle = handle if obj is not None else None
+        if obj is not None:
+            obj.selected = True
+        self.revision += 1
+
+    def select_many(self, objects):
+        """Select every object of 'objects' still in the scene, the last one becomes the current one"""
+        self.select(None)
+        for obj in objects:
+            if obj.handle in self.objects:
+                obj.selected = True
+                self.selected_handle = obj.handle
+        self.revision += 1
 
     def select_next(self):
-        if not self.objects:
-            return
-        if self.selected_index is None:
-            self.select(0)
-        else:
-            self.select((self.selected_index + 1) % len(self.objects))
+        self._select_step(1)
 
     def select_previous(self):
+        self._select_step(-1)
+
+    def _select_step(self, step):
         if not self.objects:
             return
-        if self.selected_index is None:
-            self.select(len(self.objects) - 1)
+        index = self.objects.index(self.selected_handle)
+        if index is None:
+            index = 0 if step > 0 else len(self.objects) - 1
         else:
-            self.select((self.selected_index - 1) % len(self.objects))
+            index = (index + step) % len(self.objects)
+        self.select(self.objects.handles[index])
 
     def get_selected(self):
-        if self.selected_index is not None:
-            return self.objects[self.selected_index]
-        return None
+        return self.objects.get(self.selected_handle)
+
+    def scene_bvh(self):
+        """BVH over the objects' world AABBs, item i being the object in row i"""
+        if self.bvh is None:
+            models = self.model_matrices()
+            box_mins = np.array([obj.drawable.aabb[0] for obj in self.objects]).reshape(-1, 3)
+            box_maxs = np.array([obj.drawable.aabb[1] for obj in self.objects]).reshape(-1, 3)
+            self.bvh = BVH(*transform_boxes(models, box_mins, box_maxs))
+            for item, obj in enumerate(self.objects):
+                obj.bvh_item = item
+        return self.bvh
+
+    def raycast(self, origin, direction, visible_only=True):
+        """(object, entry distance) pairs whose world AABB the ray hits, nearest first"""
+        items, distances = self.scene_bvh().query_ray(origin, direction)
+        hits = [(self.objects.values[item], float(t)) for item, t in zip(items, distances)]
+        return [hit for hit in hits if hit[0].visible or not visible_only]
+
+    def pick(self, origin, direction):
+        """
+        (handle, t) of the visible object whose triangles the ray hits first, None on a miss.
+        Objects come from the scene BVH nearest box first and are tested against their own
+        triangle BVH in local space, until the next box starts behind the best hit.
+        """
+        best = None, np.inf
+        for obj, box_t in self.raycast(origin, direction):
+            if box_t > best[1]:
+                break
+            inverse = np.linalg.inv(obj.get_model_matrix())
+            # t is the same parameter along the local ray, so hits of all objects compare directly
+            local_origin = inverse[:3, :3] @ origin + inverse[:3, 3]
+            t, _ = obj.drawable.picking_bvh().query_ray(local_origin, inverse[:3, :3] @ direction, best[1])
+            if t < best[1]:
+                best = obj, t
+        if best[0] is None:
+            return None
+        return best[0].handle, best[1]
+
+    def query_box(self, box_min, box_max):
+        """objects whose world AABB overlaps the [box_min, box_max] box"""
+        return [self.objects.values[item] for item in np.sort(self.scene_bvh().query_aabb(box_min, box_max))]
+
+    def query_sphere(self, center, radius):
+        """objects whose world AABB overlaps the sphere"""
+        return [self.objects.values[item] for item in np.sort(self.scene_bvh().query_sphere(center, radius))]
 
     def draw_all(self, projection, view, rendering_mode):
         if rendering_mode != self.curr_rendering_mode:
@@ -113,15 +296,61 @@ class SceneManager:
                     obj.drawable.set_rendering_mode(rendering_mode)
             self.curr_rendering_mode = rendering_mode
 
-        if rendering_mode == "wireframe":
-            GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_LINE)
-        else:
-            GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_FILL)
+        GL_STATE.set_polygon_mode(GL.GL_LINE if rendering_mode == "wireframe" else GL.GL_FILL)
 
-        for obj in self.objects:
-            if obj.visible:
-                model = obj.get_model_matrix()
-                obj.drawable.draw(projection, view, model)
+        visible, models, groups = self.visible_groups(projection, view)
+        nvisible = sum(obj.visible for obj in self.objects)
+        self.cull_stats = {"drawn": len(visible), "culled": nvisible - len(visible)}
+
+        for group in groups:
+            drawable = visible[group[0]].drawable
+            if len(group) < INSTANCING_THRESHOLD:
+                for index in group:
+                    self.render_queue.submit(visible[index].drawable, models[index], view)
+            else:
+                self.render_queue.submit(drawable, models[group], view)
+        self.render_queue.flush(projection, view)
+
+    def visible_groups(self, projection, view):
+        """
+        (objects, models, groups) for a frame: the visible objects inside the frustum, their
+        (n, 4, 4) model matrices and lists of indices into them that one instanced call can draw
+        """
+        # whole subtrees outside the frustum are skipped, only survivors get a model matrix
+        planes = frustum_planes(projection @ view)
+        bvh = self.scene_bvh()
+        items = np.sort(bvh.query_frustum(planes))
+        # the BVH is rebuilt on every add / remove, so its items are the rows
+        objects = self.objects.values
+        rows = [item for item in items if objects[item].visible]
+        models = self.model_matrices()[rows]
+
+        # a leaf straddling a plane is taken whole, the per-object tests drop its objects outside
+        inside = self.frustum_mask(planes, [objects[row] for row in rows], models, bvh.item_min[rows], bvh.item_max[rows])
+        visible = [objects[row] for row, keep in zip(rows, inside) if keep]
+        models = models[inside]
+
+        # objects sharing a VAO (see Drawable.shared) and render state go out in one instanced call
+        groups = {}
+        for index in range(len(visible)):
+            drawable = visible[index].drawable
+            key = drawable.instance_key() if drawable.instanceable else id(drawable)
+            groups.setdefault(key, []).append(index)
+        return visible, models, list(groups.values())
+
+    @staticmethod
+    def frustum_mask(planes, objects, models, box_mins, box_maxs):
+        """(n,) mask of the objects whose bounds intersect the view frustum, tested all at once"""
+        if not objects:
+            return np.zeros(0, dtype=bool)
+        centers = np.array([obj.drawable.bounding_sphere[0] for obj in objects])
+        radii = np.array([obj.drawable.bounding_sphere[1] for obj in objects])
+
+        # cheap sphere rejection first, the tighter world box test only refines what survives
+        inside = spheres_in_frustum(planes, *transform_spheres(models, centers, radii))
+        candidates = np.flatnonzero(inside)
+        inside[candidates] = boxes_in_frustum(planes, box_mins[candidates], box_maxs[candidates])
+        return inside
 
     def manipulate_selected(self, action: str, value=0.1):
         """
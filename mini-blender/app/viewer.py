@@ -4,7 +4,22 @@ import glfw
 import imgui
 
 from lib.camera import Camera
+from lib.startup import STARTUP
 from lib.transform import identity
+from lib.shader import SHADER_REGISTRY
+from lib.state import GL_STATE
+from lib.buffer import FrameUBO
+from lib.picking import PickingBuffer
+from lib.config import (
+    GLOBAL_I_LIGHT,
+    GLOBAL_K_MATERIALS,
+    GLOBAL_SHININESS,
+    GLOBAL_LIGHT_POS,
+    IDLE_TIMEOUT,
+    MAX_FPS,
+    ON_DEMAND_REDRAW,
+    REDRAW_FRAMES,
+)
 from objects.abstract import Drawable
 from app.grid import Grid
 from app.scene_manager import SceneManager
@@ -30,11 +45,17 @@ class Viewer:
         # make win's OpenGL context current; no OpenGL calls can happen before
         glfw.make_context_current(self.win)
 
+        # redraw only when something changed, see run()
+        self.on_demand = ON_DEMAND_REDRAW
+        self.redraw_frames = REDRAW_FRAMES
+
         def framebuffer_size_callback(window, width, height):
             self.size = (width, height)
             GL.glViewport(0, 0, width, height)
+            self.request_redraw()
 
         glfw.set_framebuffer_size_callback(self.win, framebuffer_size_callback)
+        glfw.set_window_refresh_callback(self.win, lambda window: self.request_redraw())
 
         # useful message to check OpenGL renderer characteristics
         print(
@@ -46,10 +67,13 @@ class Viewer:
 
         GL.glViewport(0, 0, width, height)
         GL.glClearColor(0.18, 0.18, 0.18, 1.0)
-        GL.glEnable(GL.GL_DEPTH_TEST)
+        GL_STATE.set_depth_test(True)
         # GL.glEnable(GL.GL_CULL_FACE)
         GL.glLineWidth(1.0)
 
+        # camera & light uniforms shared by every program, updated once per frame
+        self.frame_ubo = FrameUBO()
+
         # initially empty list of object to draw
         self.grid = Grid().setup()
         self.display_grid = True
@@ -62,6 +86,8 @@ class Viewer:
         )
 
         self.manipulation_mode = "camera"  # or "object"
+        self.picking_mode = "ray"  # click-to-select by CPU ray cast, or "gpu" through the id buffer
+        self.picker = PickingBuffer()  # id buffer, also behind Ctrl+drag rectangle selection
         self.rendering_mode = "phong"  # flat, gouraud, wireframe, texture
 
         # Setup input handler
@@ -74,33 +100,73 @@ class Viewer:
 
         # initialize GUI
         self.gui = GUI(self.win)
+        STARTUP.mark("window")
+
+    def request_redraw(self, frames=REDRAW_FRAMES):
+        """Draw at least 'frames' more frames, called on input and scene changes"""
+        self.redraw_frames = max(self.redraw_frames, frames)
+
+    def animating(self):
+        """Whether the next frame differs without any input, e.g. a pick waiting on its readback"""
+        return self.picker.region is not None or self.picker.pending is not None
 
     def run(self):
         """Main render loop for this OpenGL windows"""
+        SHADER_REGISTRY.report()
+        frame_interval = 1.0 / MAX_FPS
+        last_frame = -frame_interval
         while not glfw.window_should_close(self.win):
-            # clear draw buffer
-            GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
-            err = GL.glGetError()
-            if err != GL.GL_NO_ERROR:
-                print(f"OpenGL Error: {err}")
-
-            proj = self.camera.projection_matrix(self.size)
-            view = self.camera.view_matrix()
-
-            # draw scene objects
-            if self.display_grid:
-                self.grid.draw(proj, view, identity())
-            self.scene.draw_all(proj, view, self.rendering_mode)
-
-            # GUI
-            self.gui.begin_frame()
-            self.gui.render_menu_bar(self)
-            self.gui.render_scene_panel(self.scene)
-            self.gui.render_info_panel(self)
-            self.gui.end_frame()
-
-            # flush render commands, and swap draw buffers
-            glfw.swap_buffers(self.win)
-
-            # Poll for and process events
-            glfw.poll_events()
+            due = not self.on_demand or self.redraw_frames > 0 or self.animating()
+            if due and glfw.get_time() - last_frame >= frame_interval:
+                last_frame = glfw.get_time()
+                revision = self.scene.revision
+                self.draw_frame()
+                if not STARTUP.reported:
+                    STARTUP.mark("first frame")
+                    STARTUP.report()
+                self.redraw_frames = max(self.redraw_frames - 1, 0)
+                if self.scene.revision != revision:  # changed from the GUI during the frame
+                    self.request_redraw()
+
+            # Poll for and process events, or sleep until there are some
+            wait = frame_interval - (glfw.get_time() - last_frame) if due else IDLE_TIMEOUT
+            if not self.on_demand or wait <= 0:
+                glfw.poll_events()
+            else:
+                glfw.wait_events_timeout(wait)
+
+    def draw_frame(self):
+        """Render the scene and the GUI once and swap buffers"""
+        # ids read back from the previous frame's picking pass, if it has landed
+        picked = self.picker.poll()
+        if picked is not None:
+            self.scene.select_many(picked)
+
+        # clear draw buffer
+        GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+        err = GL.glGetError()
+        if err != GL.GL_NO_ERROR:
+            print(f"OpenGL Error: {err}")
+
+        proj = self.camera.projection_matrix(self.size)
+        view = self.camera.view_matrix()
+        self.frame_ubo.update_frame(
+            proj, view, GLOBAL_LIGHT_POS, GLOBAL_I_LIGHT, GLOBAL_K_MATERIALS, GLOBAL_SHININESS
+        )
+
+        # draw scene objects
+        if self.display_grid:
+            self.grid.draw(proj, view, identity())
+        self.scene.draw_all(proj, view, self.rendering_mode)
+        self.picker.render(self.scene, proj, view, glfw.get_framebuffer_size(self.win))
+
+        # GUI
+        self.gui.begin_frame()
+        self.gui.render_menu_bar(self)
+        self.gui.render_scene_panel(self.scene)
+        self.gui.render_info_panel(self)
+        self.gui.render_selection_rect(self.input_handler)
+        self.gui.end_frame()
+
+        # flush render commands, and swap draw buffers
+        glfw.swap_buffers(self.win)
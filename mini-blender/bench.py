@@ -0,0 +1,181 @@
+import argparse
+import time
+
+import glfw
+import numpy as np
+import OpenGL.GL as GL
+from OpenGL.GL.shaders import compileProgram, compileShader
+
+from lib import transform
+from lib.mesh import extrusion, palette_colors
+from lib.transform import normal_matrix, perspective, rotate, translate
+from objects import Cone, Cylinder, Sphere, Torus
+from objects.colors import Color
+
+# fmt: off
+NORMAL_MATRIX_VERT = """#version 330 core
+layout(location = 0) in vec3 position;
+layout(location = 2) in vec3 normal;
+uniform mat4 projection;
+uniform mat4 modelview;
+uniform mat3 normal_matrix;
+out vec3 normal_interp;
+void main() {
+  %s
+  gl_Position = projection * modelview * vec4(position, 1.0);
+}
+"""
+PER_VERTEX = "normal_interp = mat3(transpose(inverse(modelview))) * normal;"
+PER_DRAW = "normal_interp = normal_matrix * normal;"
+# fmt: on
+
+
+def hidden_context():
+    """ offscreen 3.3 core context, enough to compile and draw """
+    glfw.init()
+    glfw.window_hint(glfw.VISIBLE, False)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
+    glfw.window_hint(glfw.OPENGL_FORWARD_COMPAT, GL.GL_TRUE)
+    glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
+    window = glfw.create_window(64, 64, "bench", None, None)
+    glfw.make_context_current(window)
+    return window
+
+
+def grid_mesh(n):
+    """ n x n vertex grid with random unit normals """
+    u, v = np.meshgrid(np.linspace(-1, 1, n), np.linspace(-1, 1, n))
+    vertices = np.stack([u, v, np.zeros_like(u)], axis=-1).reshape(-1, 3).astype('f')
+    normals = np.random.default_rng(0).normal(size=vertices.shape).astype('f')
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    return vertices, normals
+
+
+def bench_normal_matrix(args):
+    """ vertex throughput with per-vertex inverse() vs. a CPU-computed normal matrix """
+    window = hidden_context()
+    vertices, normals = grid_mesh(args.size)
+    vao = GL.glGenVertexArrays(1)
+    GL.glBindVertexArray(vao)
+    vbos = GL.glGenBuffers(2)
+    for location, vbo, data in ((0, vbos[0], vertices), (2, vbos[1], normals)):
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, vbo)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, data, GL.GL_STATIC_DRAW)
+        GL.glEnableVertexAttribArray(location)
+        GL.glVertexAttribPointer(location, 3, GL.GL_FLOAT, False, 0, None)
+
+    modelview = translate(0, 0, -5) @ rotate((1, 1, 0), 30)
+    projection = perspective(45, 1, 0.1, 100)
+    GL.glEnable(GL.GL_RASTERIZER_DISCARD)  # only the vertex stage is measured
+
+    results = {}
+    for label, body in (("per-vertex inverse()", PER_VERTEX), ("uniform normal_matrix", PER_DRAW)):
+        program = compileProgram(
+            compileShader(NORMAL_MATRIX_VERT % body, GL.GL_VERTEX_SHADER), validate=False
+        )
+        GL.glUseProgram(program)
+        GL.glUniformMatrix4fv(GL.glGetUniformLocation(program, "projection"), 1, True, projection)
+        GL.glUniformMatrix4fv(GL.glGetUniformLocation(program, "modelview"), 1, True, modelview)
+        GL.glUniformMatrix3fv(GL.glGetUniformLocation(program, "normal_matrix"), 1, True, normal_matrix(modelview))
+
+        GL.glDrawArrays(GL.GL_POINTS, 0, len(vertices))  # warm-up
+        GL.glFinish()
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            GL.glDrawArrays(GL.GL_POINTS, 0, len(vertices))
+        GL.glFinish()
+        elapsed = time.perf_counter() - start
+        results[label] = len(vertices) * args.repeat / elapsed
+        GL.glDeleteProgram(program)
+
+    for label, rate in results.items():
+        print(f"[BENCH::normal_matrix] {label:>24}: {rate / 1e6:10.1f} Mvertices/s")
+    before, after = results.values()
+    print(f"[BENCH::normal_matrix] speed-up: {after / before:.2f}x ({len(vertices)} vertices x {args.repeat} draws)")
+
+    GL.glDeleteBuffers(2, vbos)
+    GL.glDeleteVertexArrays(1, [vao])
+    glfw.destroy_window(window)
+    glfw.terminate()
+
+
+def bench_transforms(args):
+    """ per-item throughput of the single-value transform functions vs. their batched out= variants """
+    rng = np.random.default_rng(0)
+    n = args.count
+    q0, q1 = rng.normal(size=(n, 4)).astype('f'), rng.normal(size=(n, 4)).astype('f')
+    points, angles = rng.normal(size=(n, 3)).astype('f'), rng.uniform(-np.pi, np.pi, n).astype('f')
+    matrices, quaternions = np.empty((n, 4, 4), 'f'), np.empty((n, 4), 'f')
+    up = np.tile(np.array([0, 1, 0], 'f'), (n, 1))
+
+    # name: (single call on item i, batched call into the preallocated output)
+    cases = {
+        "translate": (lambda i: transform.translate(points[i]), lambda: transform.translate_batch(points, out=matrices)),
+        "scale": (lambda i: transform.scale(points[i]), lambda: transform.scale_batch(points, out=matrices)),
+        "rotate": (lambda i: transform.rotate(points[i], radians=angles[i]), lambda: transform.rotate_batch(points, angles, out=matrices)),
+        "lookat": (lambda i: transform.lookat(points[i], q0[i, :3], up[i]), lambda: transform.lookat_batch(points, q0[:, :3], up, out=matrices)),
+        "quaternion_matrix": (lambda i: transform.quaternion_matrix(q0[i]), lambda: transform.quaternion_matrix_batch(q0, out=matrices)),
+        "quaternion_mul": (lambda i: transform.quaternion_mul(q0[i], q1[i]), lambda: transform.quaternion_mul_batch(q0, q1, out=quaternions)),
+        "quaternion_slerp": (lambda i: transform.quaternion_slerp(q0[i], q1[i], 0.3), lambda: transform.quaternion_slerp_batch(q0, q1, 0.3, out=quaternions)),
+    }
+    nloop = min(n, 10000)  # the per-item loop is timed on a slice and reported per item
+    for name, (single, batched) in cases.items():
+        start = time.perf_counter()
+        for i in range(nloop):
+            single(i)
+        loop_rate = nloop / (time.perf_counter() - start)
+
+        batched()  # warm-up
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            batched()
+        batch_rate = n * args.repeat / (time.perf_counter() - start)
+        print(f"[BENCH::transforms] {name:>18}: {loop_rate / 1e6:8.3f} M/s per item, {batch_rate / 1e6:8.1f} M/s batched ({batch_rate / loop_rate:.0f}x)")
+
+
+def bench_meshes(args):
+    """ vertex / index / normal generation of a Sphere and a Torus of about size x size vertices, and of a
+        Cylinder and a Cone of size segments; the VAO and shaders of the Drawable are set up once, outside the timing """
+    window = hidden_context()
+    grid = lambda mesh: (mesh._generate_vertices(), mesh._generate_indices(), mesh._generate_normals())
+    cases = {
+        "Sphere": (lambda: Sphere(nsegments=int(round(np.sqrt(2) * args.size))), grid),
+        "Torus": (lambda: Torus(major_nsegments=args.size, minor_nsegments=args.size), grid),
+        "Cylinder": (lambda: Cylinder(nsegments=args.size), lambda mesh: extrusion(mesh.nsegments, mesh.radius, mesh.height)),
+        "Cone": (lambda: Cone(nsegments=args.size),
+                 lambda mesh: (mesh._generate_vertices(), mesh._generate_indexes(), mesh._generate_normals())),
+    }
+    for name, (build, generate) in cases.items():
+        mesh = build()  # warm-up, and the instance whose geometry is regenerated
+        times = []
+        for _ in range(max(args.repeat // 10, 1)):
+            start = time.perf_counter()
+            generate(mesh)
+            palette_colors(len(mesh.vertices), Color.all_colors)
+            times.append(time.perf_counter() - start)
+        print(f"[BENCH::meshes] {name:>8}: {len(mesh.vertices):9d} vertices, {len(mesh.indices) // 3:9d} triangles in {min(times) * 1000:7.1f} ms")
+        mesh.destroy()
+    glfw.destroy_window(window)
+    glfw.terminate()
+
+
+BENCHMARKS = {
+    "meshes": bench_meshes,
+    "normal_matrix": bench_normal_matrix,
+    "transforms": bench_transforms,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mini-blender micro-benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--size", type=int, default=1024, help="grid resolution (size x size vertices)")
+    parser.add_argument("--repeat", type=int, default=50, help="number of timed iterations")
+    parser.add_argument("--count", type=int, default=100000, help="items per batch (transforms)")
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import numpy as np
+
+
+def bounding_box(vertices):
+    """ axis-aligned (min, max) corners of a (n, 3) vertex array """
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    return vertices.min(axis=0), vertices.max(axis=0)
+
+
+def bounding_sphere(vertices):
+    """ (center, radius) sphere around the box center, enclosing every vertex """
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    box_min, box_max = bounding_box(vertices)
+    center = (box_min + box_max) / 2
+    return center, float(np.linalg.norm(vertices - center, axis=1).max())
+
+
+def frustum_planes(clip):
+    """ 6 normalized (a, b, c, d) planes of the frustum of 'clip' = projection @ view, inside >= 0 """
+    clip = np.asarray(clip, dtype=np.float64)
+    planes = np.array([clip[3] + clip[0], clip[3] - clip[0],   # left, right
+                       clip[3] + clip[1], clip[3] - clip[1],   # bottom, top
+                       clip[3] + clip[2], clip[3] - clip[2]])  # near, far
+    return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+
+def transform_spheres(models, centers, radii):
+    """ world spheres of (n, 4, 4) 'models' applied to local (n, 3) centers and (n,) radii """
+    world_centers = np.einsum('nij,nj->ni', models[:, :3, :3], centers) + models[:, :3, 3]
+    scales = np.linalg.norm(models[:, :3, :3], axis=1).max(axis=1)  # largest column = largest axis scale
+    return world_centers, radii * scales
+
+
+def transform_boxes(models, box_mins, box_maxs):
+    """ world AABBs (min, max) enclosing the (n, 4, 4) 'models' applied to local (n, 3) boxes """
+    centers = (box_mins + box_maxs) / 2
+    extents = (box_maxs - box_mins) / 2
+    world_centers = np.einsum('nij,nj->ni', models[:, :3, :3], centers) + models[:, :3, 3]
+    world_extents = np.einsum('nij,nj->ni', np.abs(models[:, :3, :3]), extents)
+    return world_centers - world_extents, world_centers + world_extents
+
+
+def spheres_in_frustum(planes, centers, radii):
+    """ (n,) mask of spheres not entirely behind one of the planes """
+    distances = centers @ planes[:, :3].T + planes[:, 3]
+    return np.all(distances >= -radii[:, None], axis=1)
+
+
+def boxes_in_frustum(planes, box_mins, box_maxs):
+    """ (n,) mask of AABBs whose corner furthest along each plane normal is inside it """
+    normals = planes[:, :3]
+    # positive vertex per (box, plane): max corner where the normal is positive, else min corner
+    positive = np.where(normals[None, :, :] >= 0, box_maxs[:, None, :], box_mins[:, None, :])
+    distances = np.einsum('npk,pk->np', positive, normals) + planes[:, 3]
+    return np.all(distances >= 0, axis=1)
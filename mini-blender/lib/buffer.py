@@ -1,16 +1,93 @@
 from .shader import *
+from .state import GL_STATE
 import OpenGL.GL as GL
-import cv2
+import ctypes
+
+# fmt: off
+# vertex attribute formats: numpy dtype, numpy shape, GL components, GL type, normalized
+ATTRIBUTE_FORMATS = {
+    "float2":             ("<f4", (2,), 2, GL.GL_FLOAT, False),
+    "float3":             ("<f4", (3,), 3, GL.GL_FLOAT, False),
+    "half4":              ("<f2", (4,), 4, GL.GL_HALF_FLOAT, False),  # xyz + w=1, keeps 4-byte alignment
+    "int_2_10_10_10_rev": ("<u4", (),   4, GL.GL_INT_2_10_10_10_REV, True),  # signed normalized xyz
+    "ubyte4":             ("u1",  (4,), 4, GL.GL_UNSIGNED_BYTE, True),  # rgb + a=1 in [0, 255]
+}
+# fmt: on
+
+
+def pack_half4(data):
+    """(n, 3) floats -> (n, 4) float16 with w = 1"""
+    packed = np.ones((len(data), 4), dtype=np.float16)
+    packed[:, : data.shape[1]] = data
+    return packed
+
+
+def pack_int_2_10_10_10_rev(data):
+    """(n, 3) unit vectors -> one uint32 per row, 10 signed bits per component"""
+    snorm = np.rint(np.clip(data[:, :3], -1.0, 1.0) * 511.0).astype(np.int32) & 0x3FF
+    return (snorm[:, 0] | (snorm[:, 1] << 10) | (snorm[:, 2] << 20)).astype(np.uint32)
+
+
+def pack_ubyte4(data):
+    """(n, 3) colors in [0, 1] -> (n, 4) normalized bytes with alpha = 255"""
+    packed = np.full((len(data), 4), 255, dtype=np.uint8)
+    packed[:, : data.shape[1]] = np.rint(np.clip(data, 0.0, 1.0) * 255.0)
+    return packed
+
+
+ATTRIBUTE_PACKERS = {
+    "half4": pack_half4,
+    "int_2_10_10_10_rev": pack_int_2_10_10_10_rev,
+    "ubyte4": pack_ubyte4,
+}
+
+
+class VertexLayout(object):
+    """Interleaved vertex format: every attribute location at its own offset in one shared stride"""
+
+    def __init__(self, formats):
+        # formats: {location: format name from ATTRIBUTE_FORMATS}
+        self.formats = dict(formats)
+        self.dtype = np.dtype(
+            [
+                (f"a{location}", ATTRIBUTE_FORMATS[fmt][0], ATTRIBUTE_FORMATS[fmt][1])
+                for location, fmt in self.formats.items()
+            ]
+        )
+        self.stride = self.dtype.itemsize
+
+    def offset(self, location):
+        return self.dtype.fields[f"a{location}"][1]
+
+    def pack(self, arrays, count):
+        """Interleave {location: array} into a structured array of 'count' vertices"""
+        vertices = np.zeros(count, dtype=self.dtype)
+        for location, fmt in self.formats.items():
+            ncols = min(ATTRIBUTE_FORMATS[fmt][2], 3)  # packed formats take xyz / rgb
+            data = VertexLayout.fit(arrays[location], ncols, count)
+            packer = ATTRIBUTE_PACKERS.get(fmt)
+            vertices[f"a{location}"] = packer(data) if packer else data
+        return vertices
+
+    @staticmethod
+    def fit(data, ncols, count):
+        """Reshape to rows of 'ncols' and match 'count' rows, repeating the last row if short"""
+        data = np.asarray(data, dtype=np.float32).reshape(-1, ncols)
+        if len(data) >= count:
+            return data[:count]
+        return np.vstack([data, np.repeat(data[-1:], count - len(data), axis=0)])
 
 
 class VAO(object):
     def __init__(self):
 
         self.vao = GL.glGenVertexArrays(1)
-        GL.glBindVertexArray(self.vao)
-        GL.glBindVertexArray(0)
+        self.activate()
+        self.deactivate()
         self.vbo = {}
         self.ebo = None
+        self.layout = None
+        self.sizes = {}  # buffer -> allocated bytes, to tell in-place updates from reallocations
 
     def add_vbo(
         self,
@@ -32,23 +109,132 @@ class VAO(object):
         )
         GL.glEnableVertexAttribArray(location)
         self.vbo[location] = buffer_idx
+        self.sizes[buffer_idx] = data.nbytes
         self.deactivate()  # VAO
 
+    def add_interleaved(self, arrays, formats, count=None, usage=GL.GL_STATIC_DRAW):
+        """
+        Upload {location: array} as one interleaved buffer laid out by 'formats'
+        ({location: format name}); 'count' defaults to the rows of the first array.
+        """
+        layout = VertexLayout({location: formats[location] for location in arrays})
+        if count is None:
+            count = len(np.asarray(next(iter(arrays.values()))).reshape(-1, 3))
+        vertices = layout.pack(arrays, count)
+
+        self.activate()  # VAO
+        buffer_idx = GL.glGenBuffers(1)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, buffer_idx)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, vertices.nbytes, vertices.view(np.uint8), usage)
+        for location, fmt in layout.formats.items():
+            _, _, ncomponents, dtype, normalized = ATTRIBUTE_FORMATS[fmt]
+            GL.glVertexAttribPointer(
+                location, ncomponents, dtype, normalized, layout.stride,
+                ctypes.c_void_p(layout.offset(location)),
+            )
+            GL.glEnableVertexAttribArray(location)
+            self.vbo[location] = buffer_idx
+        self.sizes[buffer_idx] = vertices.nbytes
+        self.deactivate()  # VAO
+        self.layout = layout
+        return layout
+
     def add_ebo(self, indices):
         self.activate()
         self.ebo = GL.glGenBuffers(1)
         GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self.ebo)
         GL.glBufferData(GL.GL_ELEMENT_ARRAY_BUFFER, indices, GL.GL_STATIC_DRAW)
+        self.sizes[self.ebo] = indices.nbytes
         self.deactivate()
 
+    def _write(self, target, buffer_idx, data, offset=0, orphan=False, replace=False):
+        """
+        Write 'data' at byte 'offset' of an existing buffer with glBufferSubData, the rest
+        of the buffer left as it is. 'replace' makes the buffer hold exactly 'data', the
+        storage respecified only if that grows or shrinks it; 'orphan' respecifies it for a
+        write covering all of it, so the driver can hand out a fresh block instead of
+        waiting on draws still reading the old one.
+        """
+        size = self.sizes[buffer_idx]
+        if (orphan or replace) and offset != 0:
+            raise ValueError("Orphaning or replacing respecifies the whole buffer, offset must be 0")
+        if orphan and not replace and data.nbytes != size:
+            raise ValueError(f"Orphaning write of {data.nbytes} bytes must cover all {size} bytes, resize with replace=True")
+        if not (orphan or replace) and offset + data.nbytes > size:
+            raise ValueError(
+                f"Update of {data.nbytes} bytes at offset {offset} overflows buffer of {size} bytes, resize with replace=True"
+            )
+
+        self.activate()  # VAO, the element array binding is part of its state
+        GL.glBindBuffer(target, buffer_idx)
+        if orphan or (replace and data.nbytes != size):
+            GL.glBufferData(target, data.nbytes, data, GL.GL_DYNAMIC_DRAW)
+            self.sizes[buffer_idx] = data.nbytes
+        else:
+            GL.glBufferSubData(target, offset, data.nbytes, data)
+        self.deactivate()  # VAO
+
+    def update_vbo(self, location, data, first=0, orphan=False, replace=False):
+        """Overwrite the separate VBO at 'location' starting at element row 'first', see _write"""
+        data = np.ascontiguousarray(data)
+        row_bytes = data.nbytes // max(len(data), 1)
+        self._write(GL.GL_ARRAY_BUFFER, self.vbo[location], data, first * row_bytes, orphan, replace)
+
+    def update_interleaved(self, arrays, first=0, orphan=False, replace=False):
+        """Repack {location: array} with the interleaved layout and write it from vertex 'first', see _write"""
+        count = len(np.asarray(arrays[next(iter(self.layout.formats))]).reshape(-1, 3))
+        vertices = self.layout.pack(arrays, count)
+        buffer_idx = self.vbo[next(iter(self.layout.formats))]
+        self._write(GL.GL_ARRAY_BUFFER, buffer_idx, vertices.view(np.uint8), first * self.layout.stride, orphan, replace)
+
+    def update_ebo(self, indices, first=0, orphan=False, replace=False):
+        indices = np.ascontiguousarray(indices, dtype=np.uint32)
+        self._write(GL.GL_ELEMENT_ARRAY_BUFFER, self.ebo, indices, first * indices.itemsize, orphan, replace)
+
+    def update_instances(self, data, columns):
+        """
+        Stream (n, k) float rows into this VAO's instance buffer, orphaned on every
+        update; 'columns' lists the (location, ncomponents) packed in a row and sets
+        up the per-instance attributes on first use
+        """
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        buffer_idx = self.vbo.get(columns[0][0])
+        if buffer_idx is not None:
+            self._write(GL.GL_ARRAY_BUFFER, buffer_idx, data, orphan=True, replace=True)  # count changes per frame
+            return
+
+        self.activate()  # VAO
+        buffer_idx = GL.glGenBuffers(1)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, buffer_idx)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, data.nbytes, data, GL.GL_STREAM_DRAW)
+        self.sizes[buffer_idx] = data.nbytes
+        stride, offset = data.strides[0], 0
+        for location, ncomponents in columns:
+            GL.glVertexAttribPointer(location, ncomponents, GL.GL_FLOAT, False, stride, ctypes.c_void_p(offset))
+            GL.glEnableVertexAttribArray(location)
+            GL.glVertexAttribDivisor(location, 1)
+            self.vbo[location] = buffer_idx
+            offset += ncomponents * data.itemsize
+        self.deactivate()  # VAO
+
+    def set_instance_attribute(self, location, buffer_idx, offset=0, ncomponents=3, dtype=GL.GL_FLOAT, divisor=1):
+        """Point 'location' at 'offset' bytes into a buffer owned elsewhere, advancing once per instance"""
+        self.activate()  # VAO
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, buffer_idx)
+        GL.glVertexAttribPointer(location, ncomponents, dtype, False, 0, ctypes.c_void_p(offset))
+        GL.glEnableVertexAttribArray(location)
+        GL.glVertexAttribDivisor(location, divisor)
+        self.deactivate()  # VAO
+
     def destroy(self):
         try:
-            GL.glBindVertexArray(0)
+            self.deactivate()
             if getattr(self, "ebo", None):
                 GL.glDeleteBuffers(1, [self.ebo])
                 self.ebo = None
             if getattr(self, "vbo", None):
-                GL.glDeleteBuffers(len(self.vbo), list(self.vbo.values()))
+                buffers = list(set(self.vbo.values()))  # interleaved locations share one buffer
+                GL.glDeleteBuffers(len(buffers), buffers)
                 self.vbo.clear()
             if getattr(self, "vao", None):
                 GL.glDeleteVertexArrays(1, [self.vao])
@@ -64,10 +250,167 @@ class VAO(object):
         #     GL.glDeleteBuffers(1, [self.ebo])
 
     def activate(self):
-        GL.glBindVertexArray(self.vao)  # activated
+        GL_STATE.bind_vao(self.vao)  # activated, skipped if already bound
 
     def deactivate(self):
-        GL.glBindVertexArray(0)  # activated
+        GL_STATE.bind_vao(0)
+
+
+class RingBuffer(object):
+    """
+    Triple-buffered stream for per-frame data: the CPU fills one region while the GPU
+    may still be reading the previous ones, and a fence per region guards its reuse.
+    Call write() before the draw that reads the region and fence() right after it.
+    """
+
+    def __init__(self, region_size, nregions=3, target=GL.GL_ARRAY_BUFFER):
+        self.target = target
+        self.region_size = region_size
+        self.nregions = nregions
+        self.fences = [None] * nregions
+        self.index = 0
+        self.buffer = GL.glGenBuffers(1)
+        GL.glBindBuffer(target, self.buffer)
+        GL.glBufferData(target, region_size * nregions, None, GL.GL_STREAM_DRAW)
+        GL.glBindBuffer(target, 0)
+
+    def write(self, data):
+        """Copy 'data' into the current region, returns its byte offset in the buffer"""
+        data = np.ascontiguousarray(data)
+        if data.nbytes > self.region_size:
+            raise ValueError(f"{data.nbytes} bytes do not fit a {self.region_size}-byte region")
+
+        fence = self.fences[self.index]
+        if fence is not None:  # only waits if the GPU is a full ring behind
+            while GL.glClientWaitSync(fence, GL.GL_SYNC_FLUSH_COMMANDS_BIT, 1000000) == GL.GL_TIMEOUT_EXPIRED:
+                pass
+            GL.glDeleteSync(fence)
+            self.fences[self.index] = None
+
+        offset = self.index * self.region_size
+        GL.glBindBuffer(self.target, self.buffer)
+        # the fence already guarantees the region is idle, skip the driver's own sync
+        access = GL.GL_MAP_WRITE_BIT | GL.GL_MAP_INVALIDATE_RANGE_BIT | GL.GL_MAP_UNSYNCHRONIZED_BIT
+        pointer = GL.glMapBufferRange(self.target, offset, data.nbytes, access)
+        ctypes.memmove(pointer, data.ctypes.data, data.nbytes)
+        GL.glUnmapBuffer(self.target)
+        GL.glBindBuffer(self.target, 0)
+        return offset
+
+    def fence(self):
+        """Mark the current region as in flight and move on to the next one"""
+        self.fences[self.index] = GL.glFenceSync(GL.GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+        self.index = (self.index + 1) % self.nregions
+
+    def destroy(self):
+        try:
+            for fence in self.fences:
+                if fence is not None:
+                    GL.glDeleteSync(fence)
+            self.fences = [None] * self.nregions
+            if getattr(self, "buffer", None):
+                GL.glDeleteBuffers(1, [self.buffer])
+                self.buffer = None
+        except Exception:
+            pass
+
+
+class UBO(object):
+    """Uniform buffer object attached to a fixed binding point"""
+
+    def __init__(self, binding, size):
+        self.binding = binding
+        self.size = size
+        self.ubo = GL.glGenBuffers(1)
+        GL.glBindBuffer(GL.GL_UNIFORM_BUFFER, self.ubo)
+        GL.glBufferData(GL.GL_UNIFORM_BUFFER, size, None, GL.GL_DYNAMIC_DRAW)
+        GL.glBindBufferBase(GL.GL_UNIFORM_BUFFER, binding, self.ubo)
+        GL.glBindBuffer(GL.GL_UNIFORM_BUFFER, 0)
+
+    def update(self, data, offset=0):
+        GL.glBindBuffer(GL.GL_UNIFORM_BUFFER, self.ubo)
+        GL.glBufferSubData(GL.GL_UNIFORM_BUFFER, offset, data.nbytes, data)
+        GL.glBindBuffer(GL.GL_UNIFORM_BUFFER, 0)
+
+    def destroy(self):
+        try:
+            if getattr(self, "ubo", None):
+                GL.glDeleteBuffers(1, [self.ubo])
+                self.ubo = None
+        except Exception:
+            pass
+
+
+class FrameUBO(UBO):
+    """
+    Camera and light data shared by all programs, written once per frame.
+    Mirrors the std140 FrameData block declared in the shaders:
+        mat4  projection    offset   0
+        mat4  view          offset  64
+        vec3  light_pos     offset 128  (eye space)
+        float shininess     offset 140
+        mat3  I_light       offset 144  (3 columns padded to vec4)
+        mat3  K_materials   offset 192
+    """
+
+    SIZE = 240
+
+    def __init__(self):
+        super().__init__(FRAME_BLOCK_BINDING, FrameUBO.SIZE)
+        self.data = np.zeros(FrameUBO.SIZE // 4, dtype=np.float32)
+
+    def update_frame(self, projection, view, light_pos, I_light, K_materials, shininess):
+        # std140 matrices are column-major, numpy ones are row-major
+        self.data[0:16] = np.asarray(projection, dtype=np.float32).T.ravel()
+        self.data[16:32] = np.asarray(view, dtype=np.float32).T.ravel()
+        light_pos_eye4 = view @ np.array([light_pos[0], light_pos[1], light_pos[2], 1.0], dtype=np.float32)
+        self.data[32:35] = light_pos_eye4[:3]
+        self.data[35] = shininess
+        # rows of I_light / K_materials were uploaded as matrix columns before (transpose=False)
+        self.data[36:48].reshape(3, 4)[:, :3] = I_light
+        self.data[48:60].reshape(3, 4)[:, :3] = K_materials
+        self.update(self.data)
+
+
+class GeometryCache(object):
+    """
+    Reference-counted set-up drawables keyed by (class, constructor arguments), so
+    identical primitives share one VAO and one set of buffers, see Drawable.shared
+    """
+
+    def __init__(self):
+        self.entries = {}  # key -> prototype drawable owning the GPU buffers
+        self.refcounts = {}  # key -> number of drawables sharing it
+        self.build_count = 0
+
+    def acquire(self, key, build):
+        prototype = self.entries.get(key)
+        if prototype is None:
+            prototype = build()
+            self.entries[key] = prototype
+            self.refcounts[key] = 0
+            self.build_count += 1
+        self.refcounts[key] += 1
+        return prototype
+
+    def release(self, key):
+        if key not in self.entries:
+            return
+        self.refcounts[key] -= 1
+        if self.refcounts[key] <= 0:
+            prototype = self.entries.pop(key)
+            del self.refcounts[key]
+            prototype.destroy()
+
+    def stats(self):
+        return {
+            "meshes": len(self.entries),
+            "references": sum(self.refcounts.values()),
+            "build_count": self.build_count,
+        }
+
+
+GEOMETRY_CACHE = GeometryCache()
 
 
 class UManager(object):
@@ -77,6 +420,8 @@ class UManager(object):
 
     @staticmethod
     def load_texture(filename):
+        import cv2  # deferred, OpenCV alone costs more than the rest of startup
+
         texture = cv2.cvtColor(cv2.imread(filename, 1), cv2.COLOR_BGR2RGB)
         return texture
 
@@ -103,22 +448,16 @@ class UManager(object):
     def setup_texture(self, sampler_name, image_file):
         rgb_image = UManager.load_texture(image_file)
 
-        GL.glUseProgram(
-            self.shader.render_idx
-        )  # must call before calling to GL.glUniform1i
+        self.shader.use()  # must call before calling to GL.glUniform1i
         texture_idx = GL.glGenTextures(1)
         binding_loc = self._get_texture_loc()
         self.textures[binding_loc] = {}
         self.textures[binding_loc]["id"] = texture_idx
         self.textures[binding_loc]["name"] = sampler_name
 
-        GL.glActiveTexture(
-            GL.GL_TEXTURE0 + binding_loc
-        )  # activate texture GL.GL_TEXTURE0, GL.GL_TEXTURE1, ...
-        GL.glBindTexture(GL.GL_TEXTURE_2D, texture_idx)
-        GL.glUniform1i(
-            GL.glGetUniformLocation(self.shader.render_idx, sampler_name), binding_loc
-        )
+        # activate texture GL.GL_TEXTURE0, GL.GL_TEXTURE1, ...
+        GL_STATE.bind_texture(binding_loc, texture_idx)
+        GL.glUniform1i(self.get_uniform_location(sampler_name), binding_loc)
 
         GL.glTexImage2D(
             GL.GL_TEXTURE_2D,
@@ -134,32 +473,53 @@ class UManager(object):
         GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR)
         GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR)
 
+    def bind_textures(self):
+        """Bind this manager's textures to their units, needed before every draw that samples them"""
+        for binding_loc, texture in self.textures.items():
+            GL_STATE.bind_texture(binding_loc, texture["id"])
+
+    def get_uniform_location(self, name):
+        # locations are resolved once at link time, see Shader._query_uniforms
+        return self.shader.uniforms.get(name, -1)
+
     def upload_uniform_matrix4fv(self, matrix, name, transpose=True):
-        GL.glUseProgram(self.shader.render_idx)
-        location = GL.glGetUniformLocation(self.shader.render_idx, name)
+        location = self.get_uniform_location(name)
+        if location < 0:
+            return
+        self.shader.use()
         GL.glUniformMatrix4fv(location, 1, transpose, matrix)
 
     def upload_uniform_matrix3fv(self, matrix, name, transpose=False):
-        GL.glUseProgram(self.shader.render_idx)
-        location = GL.glGetUniformLocation(self.shader.render_idx, name)
+        location = self.get_uniform_location(name)
+        if location < 0:
+            return
+        self.shader.use()
         GL.glUniformMatrix3fv(location, 1, transpose, matrix)
 
     def upload_uniform_vector4fv(self, vector, name):
-        GL.glUseProgram(self.shader.render_idx)
-        location = GL.glGetUniformLocation(self.shader.render_idx, name)
+        location = self.get_uniform_location(name)
+        if location < 0:
+            return
+        self.shader.use()
         GL.glUniform4fv(location, 1, vector)
 
     def upload_uniform_vector3fv(self, vector, name):
-        GL.glUseProgram(self.shader.render_idx)
-        location = GL.glGetUniformLocation(self.shader.render_idx, name)
+        location = self.get_uniform_location(name)
+        if location < 0:
+            return
+        self.shader.use()
         GL.glUniform3fv(location, 1, vector)
 
     def upload_uniform_scalar1f(self, scalar, name):
-        GL.glUseProgram(self.shader.render_idx)
-        location = GL.glGetUniformLocation(self.shader.render_idx, name)
+        location = self.get_uniform_location(name)
+        if location < 0:
+            return
+        self.shader.use()
         GL.glUniform1f(location, scalar)
 
     def upload_uniform_scalar1i(self, scalar, name):
-        GL.glUseProgram(self.shader.render_idx)
-        location = GL.glGetUniformLocation(self.shader.render_idx, name)
+        location = self.get_uniform_location(name)
+        if location < 0:
+            return
+        self.shader.use()
         GL.glUniform1i(location, scalar)
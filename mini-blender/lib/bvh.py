@@ -0,0 +1,288 @@
+import numpy as np
+
+SAH_BINS = 12  # candidate split planes per axis and node
+LEAF_SIZE = 4  # triangles per TriangleBVH leaf
+BRANCHING = 8  # children per TriangleBVH node, fewer levels means fewer NumPy passes
+
+
+def surface_area(box_mins, box_maxs):
+    """ (n,) surface areas of boxes, empty boxes (min > max) count as 0 """
+    d = np.maximum(box_maxs - box_mins, 0.0)
+    return 2.0 * (d[..., 0] * d[..., 1] + d[..., 1] * d[..., 2] + d[..., 2] * d[..., 0])
+
+
+def concat_ranges(first, count):
+    """ concatenation of arange(first[i], first[i] + count[i]) for all i, without a Python loop """
+    count = np.asarray(count, dtype=np.int64)
+    starts = np.repeat(np.asarray(first, dtype=np.int64) - np.cumsum(count) + count, count)
+    return starts + np.arange(count.sum())
+
+
+def ray_box_entry(origin, direction, box_mins, box_maxs, t_max=np.inf):
+    """ (n,) slab-test entry distance of the ray into each box, inf where it misses """
+    direction = np.where(direction == 0.0, 1e-30, direction)  # no 0 * inf in the slabs
+    t1 = (box_mins - origin) / direction
+    t2 = (box_maxs - origin) / direction
+    t_near = np.maximum(np.minimum(t1, t2).max(axis=-1), 0.0)
+    t_far = np.maximum(t1, t2).min(axis=-1)
+    return np.where((t_far >= t_near) & (t_near <= t_max), t_near, np.inf)
+
+
+def morton_codes(points):
+    """ (n,) 30-bit Morton codes of points quantized to 10 bits per axis over their bounding box """
+    if not len(points):
+        return np.zeros(0, dtype=np.uint64)
+    lo, hi = points.min(axis=0), points.max(axis=0)
+    cells = (points - lo) / np.where(hi > lo, hi - lo, 1.0) * 1023
+    v = cells.astype(np.uint64)
+    # spread the 10 bits of each axis so that they interleave as x y z x y z ...
+    v = (v | (v << np.uint64(16))) & np.uint64(0x030000FF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x0300F00F)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x030C30C3)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x09249249)
+    return (v[:, 0] << np.uint64(2)) | (v[:, 1] << np.uint64(1)) | v[:, 2]
+
+
+def ray_triangles(origin, direction, v0, e1, e2):
+    """ (n,) Moller-Trumbore hit distance of the ray on each (v0, v0 + e1, v0 + e2) triangle, inf where it misses """
+    p = np.cross(direction, e2)
+    det = np.einsum('ij,ij->i', e1, p)
+    det = np.where(np.abs(det) < 1e-12, np.nan, det)  # parallel to the plane: never a hit
+    s = origin - v0
+    u = np.einsum('ij,ij->i', s, p) / det
+    q = np.cross(s, e1)
+    v = (q @ direction) / det
+    t = np.einsum('ij,ij->i', e2, q) / det
+    hit = (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0)
+    return np.where(hit, t, np.inf)
+
+
+class BVH(object):
+    """
+    Bounding volume hierarchy over item AABBs with one item per leaf, built top-down
+    with a binned surface area heuristic. Node i covers order[first[i]:first[i] + count[i]],
+    so a subtree's items come out as one slice. refit() keeps it valid when an item
+    moves; its topology only improves with a new build.
+    """
+
+    def __init__(self, box_mins, box_maxs):
+        self.item_min = np.array(box_mins, dtype=np.float64).reshape(-1, 3)
+        self.item_max = np.array(box_maxs, dtype=np.float64).reshape(-1, 3)
+        nitems = len(self.item_min)
+        nnodes = max(2 * nitems - 1, 0)
+
+        self.node_min = np.zeros((nnodes, 3))
+        self.node_max = np.zeros((nnodes, 3))
+        self.left = np.full(nnodes, -1, dtype=np.int64)  # -1 on leaves
+        self.right = np.full(nnodes, -1, dtype=np.int64)
+        self.parent = np.full(nnodes, -1, dtype=np.int64)
+        self.first = np.zeros(nnodes, dtype=np.int64)
+        self.count = np.zeros(nnodes, dtype=np.int64)
+        self.order = np.arange(nitems)
+        self.leaf_of = np.zeros(nitems, dtype=np.int64)  # item -> its leaf node
+        if nitems:
+            self._build()
+
+    def __len__(self):
+        return len(self.order)
+
+    def _build(self):
+        centroids = (self.item_min + self.item_max) / 2
+        next_node = 1
+        stack = [(0, 0, len(self.order))]
+        while stack:
+            node, first, count = stack.pop()
+            items = self.order[first : first + count]
+            self.node_min[node] = self.item_min[items].min(axis=0)
+            self.node_max[node] = self.item_max[items].max(axis=0)
+            self.first[node], self.count[node] = first, count
+            if count == 1:
+                self.leaf_of[items[0]] = node
+                continue
+
+            in_left = self._sah_partition(items, centroids[items])
+            self.order[first : first + count] = np.concatenate([items[in_left], items[~in_left]])
+            nleft = int(in_left.sum())
+
+            left, right = next_node, next_node + 1
+            next_node += 2
+            self.left[node], self.right[node] = left, right
+            self.parent[left] = self.parent[right] = node
+            stack.append((left, first, nleft))
+            stack.append((right, first + nleft, count - nleft))
+
+    def _sah_partition(self, items, centroids):
+        """ mask of the items going left under the cheapest binned SAH split, all 3 axes at once """
+        if len(items) == 2:
+            return np.array([True, False])
+        cmin, cmax = centroids.min(axis=0), centroids.max(axis=0)
+        extent = cmax - cmin
+        if not np.any(extent > 0):  # all centroids coincide: halve the list
+            return np.arange(len(items)) < len(items) // 2
+
+        # (k, 3) bin of every centroid along every axis, flat slot axis * SAH_BINS + bin
+        bins = ((centroids - cmin) / np.where(extent > 0, extent, 1.0) * SAH_BINS).astype(np.int64)
+        bins = np.minimum(bins, SAH_BINS - 1)
+        slots = (bins + np.arange(3) * SAH_BINS).ravel()
+        bin_count = np.bincount(slots, minlength=3 * SAH_BINS).reshape(3, SAH_BINS)
+        bin_min = np.full((3 * SAH_BINS, 3), np.inf)
+        bin_max = np.full((3 * SAH_BINS, 3), -np.inf)
+        np.minimum.at(bin_min, slots, np.repeat(self.item_min[items], 3, axis=0))
+        np.maximum.at(bin_max, slots, np.repeat(self.item_max[items], 3, axis=0))
+        bin_min, bin_max = bin_min.reshape(3, SAH_BINS, 3), bin_max.reshape(3, SAH_BINS, 3)
+
+        # split after bin i: prefix boxes on the left, suffix boxes on the right
+        left_area = surface_area(np.minimum.accumulate(bin_min, axis=1), np.maximum.accumulate(bin_max, axis=1))
+        right_area = surface_area(
+            np.minimum.accumulate(bin_min[:, ::-1], axis=1)[:, ::-1],
+            np.maximum.accumulate(bin_max[:, ::-1], axis=1)[:, ::-1],
+        )
+        left_count = np.cumsum(bin_count, axis=1)[:, :-1]
+        right_count = len(items) - left_count
+        cost = left_area[:, :-1] * left_count + right_area[:, 1:] * right_count
+        cost[(left_count == 0) | (right_count == 0) | (extent[:, None] <= 0)] = np.inf
+        axis, split = np.unravel_index(np.argmin(cost), cost.shape)
+        if np.isinf(cost[axis, split]):
+            return np.arange(len(items)) < len(items) // 2
+        return bins[:, axis] <= split
+
+    def refit(self, item, box_min, box_max):
+        """ move one item's box and grow / shrink its ancestors, stopping once one is unchanged """
+        self.item_min[item], self.item_max[item] = box_min, box_max
+        node = self.leaf_of[item]
+        self.node_min[node], self.node_max[node] = box_min, box_max
+        node = self.parent[node]
+        while node >= 0:
+            left, right = self.left[node], self.right[node]
+            node_min = np.minimum(self.node_min[left], self.node_min[right])
+            node_max = np.maximum(self.node_max[left], self.node_max[right])
+            if np.array_equal(node_min, self.node_min[node]) and np.array_equal(node_max, self.node_max[node]):
+                break
+            self.node_min[node], self.node_max[node] = node_min, node_max
+            node = self.parent[node]
+
+    def _traverse(self, classify):
+        """
+        Breadth-first traversal, one NumPy pass per tree level. classify(nodes) returns
+        (outside, inside) masks: outside subtrees are skipped, inside ones are taken
+        whole, straddling leaves are taken and straddling inner nodes are opened.
+        """
+        if not len(self.order):
+            return np.zeros(0, dtype=np.int64)
+        taken = []
+        frontier = np.zeros(1, dtype=np.int64)
+        while len(frontier):
+            outside, inside = classify(frontier)
+            is_leaf = self.left[frontier] < 0
+            take = frontier[inside | (~outside & is_leaf)]
+            taken.append(concat_ranges(self.first[take], self.count[take]))
+            opened = frontier[~outside & ~inside & ~is_leaf]
+            frontier = np.concatenate([self.left[opened], self.right[opened]])
+        return self.order[np.concatenate(taken)]
+
+    def query_frustum(self, planes):
+        """ items whose box is not entirely outside one of the (6, 4) frustum planes """
+        normals, offsets = planes[:, :3], planes[:, 3]
+
+        def classify(nodes):
+            mins, maxs = self.node_min[nodes][:, None, :], self.node_max[nodes][:, None, :]
+            positive = np.where(normals >= 0, maxs, mins)  # corner furthest along each normal
+            negative = np.where(normals >= 0, mins, maxs)
+            outside = np.any(np.einsum('npk,pk->np', positive, normals) + offsets < 0, axis=1)
+            inside = np.all(np.einsum('npk,pk->np', negative, normals) + offsets >= 0, axis=1)
+            return outside, inside
+
+        return self._traverse(classify)
+
+    def query_aabb(self, box_min, box_max):
+        """ items whose box overlaps the [box_min, box_max] box """
+
+        def classify(nodes):
+            mins, maxs = self.node_min[nodes], self.node_max[nodes]
+            outside = np.any((maxs < box_min) | (mins > box_max), axis=1)
+            inside = np.all((mins >= box_min) & (maxs <= box_max), axis=1)
+            return outside, inside
+
+        return self._traverse(classify)
+
+    def query_sphere(self, center, radius):
+        """ items whose box overlaps the sphere """
+
+        def classify(nodes):
+            mins, maxs = self.node_min[nodes], self.node_max[nodes]
+            nearest = np.sum((np.clip(center, mins, maxs) - center) ** 2, axis=1)
+            furthest = np.sum(np.maximum(np.abs(center - mins), np.abs(center - maxs)) ** 2, axis=1)
+            return nearest > radius**2, furthest <= radius**2
+
+        return self._traverse(classify)
+
+    def query_ray(self, origin, direction, t_max=np.inf):
+        """ (items, entry distances) of the item boxes hit by the ray, nearest first """
+        origin, direction = np.asarray(origin, dtype=np.float64), np.asarray(direction, dtype=np.float64)
+
+        def classify(nodes):
+            t = ray_box_entry(origin, direction, self.node_min[nodes], self.node_max[nodes], t_max)
+            return np.isinf(t), np.zeros(len(nodes), dtype=bool)
+
+        items = self._traverse(classify)
+        t = ray_box_entry(origin, direction, self.item_min[items], self.item_max[items], t_max)
+        order = np.argsort(t, kind="stable")
+        return items[order], t[order]
+
+
+class TriangleBVH(object):
+    """
+    Linear BVH over the triangles of one mesh, for ray picking. Triangles are sorted along
+    a Morton curve and grouped LEAF_SIZE per leaf, then every BRANCHING consecutive nodes
+    get a parent, so the build is a sort plus a few reductions and node i of a level has
+    its children at BRANCHING * i + [0, BRANCHING) of the next one.
+    """
+
+    def __init__(self, vertices, triangles):
+        corners = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)[np.asarray(triangles).reshape(-1, 3)]
+        tri_min, tri_max = corners.min(axis=1), corners.max(axis=1)
+        self.triangle_ids = np.argsort(morton_codes((tri_min + tri_max) / 2), kind="stable")
+        corners = corners[self.triangle_ids]
+        self.v0 = corners[:, 0]
+        self.e1 = corners[:, 1] - self.v0
+        self.e2 = corners[:, 2] - self.v0
+
+        # leaves from the sorted triangle boxes, padded with empty boxes to whole leaves
+        nleaves = -(-len(corners) // LEAF_SIZE)
+        mins = np.full((nleaves * LEAF_SIZE, 3), np.inf, dtype=np.float32)
+        maxs = np.full((nleaves * LEAF_SIZE, 3), -np.inf, dtype=np.float32)
+        mins[: len(corners)], maxs[: len(corners)] = tri_min[self.triangle_ids], tri_max[self.triangle_ids]
+        self.levels = [(mins.reshape(-1, LEAF_SIZE, 3).min(axis=1), maxs.reshape(-1, LEAF_SIZE, 3).max(axis=1))]
+        while len(self.levels[0][0]) > 1:
+            mins, maxs = self.levels[0]
+            npad = -len(mins) % BRANCHING
+            mins = np.concatenate([mins, np.full((npad, 3), np.inf, dtype=np.float32)])
+            maxs = np.concatenate([maxs, np.full((npad, 3), -np.inf, dtype=np.float32)])
+            self.levels.insert(0, (mins.reshape(-1, BRANCHING, 3).min(axis=1), maxs.reshape(-1, BRANCHING, 3).max(axis=1)))
+
+    def __len__(self):
+        return len(self.v0)
+
+    def query_ray(self, origin, direction, t_max=np.inf):
+        """ (t, triangle) of the nearest hit of origin + t * direction, (inf, -1) on a miss """
+        origin, direction = np.asarray(origin, dtype=np.float64), np.asarray(direction, dtype=np.float64)
+        if not len(self.v0):
+            return np.inf, -1
+
+        # one slab test per level over every child of the nodes the ray still hits
+        nodes = np.zeros(1, dtype=np.int64)
+        for depth, (mins, maxs) in enumerate(self.levels):
+            if depth:
+                nodes = (nodes[:, None] * BRANCHING + np.arange(BRANCHING)).ravel()
+                nodes = nodes[nodes < len(mins)]
+            nodes = nodes[np.isfinite(ray_box_entry(origin, direction, mins[nodes], maxs[nodes], t_max))]
+            if not len(nodes):
+                return np.inf, -1
+
+        candidates = (nodes[:, None] * LEAF_SIZE + np.arange(LEAF_SIZE)).ravel()
+        candidates = candidates[candidates < len(self.v0)]
+        t = ray_triangles(origin, direction, self.v0[candidates], self.e1[candidates], self.e2[candidates])
+        nearest = np.argmin(t)
+        if t[nearest] > t_max:
+            return np.inf, -1
+        return float(t[nearest]), int(self.triangle_ids[candidates[nearest]])
@@ -24,3 +24,11 @@ class Camera(Trackball):
         roll = math.acos(v[1]) * (180.0 / math.pi)
         roll = roll - 90.0
         return Camera(yaw=yaw, roll=roll, pitch=pitch, distance=distance)
+
+    def cursor_ray(self, position, winsize):
+        """ world (origin, direction) of the ray from the near plane through window 'position' """
+        x, y = 2 * position[0] / winsize[0] - 1, 1 - 2 * position[1] / winsize[1]
+        inverse = np.linalg.inv(self.projection_matrix(winsize) @ self.view_matrix())
+        near, far = inverse @ vec(x, y, -1, 1), inverse @ vec(x, y, 1, 1)
+        near, far = near[:3] / near[3], far[:3] / far[3]
+        return near, far - near
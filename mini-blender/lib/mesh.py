@@ -0,0 +1,77 @@
+import numpy as np
+
+
+def parametric_grid(surface, u, v):
+    """ (len(u) * len(v), 3) float32 points of surface(U, V) -> (x, y, z) over the 'ij' meshgrid of u, v,
+        row i of the grid (u[i]) occupying vertices i * len(v) ... (i + 1) * len(v) - 1 """
+    # U (len(u), 1) and V (1, len(v)) broadcast, so a term in one parameter is evaluated once per row / column
+    u_grid, v_grid = np.meshgrid(u, v, indexing='ij', sparse=True)
+    shape = (len(u), len(v))
+    points = np.empty(shape + (3,), dtype=np.float32)
+    for column, values in enumerate(surface(u_grid, v_grid)):
+        points[..., column] = np.broadcast_to(values, shape)
+    return points.reshape(-1, 3)
+
+
+def grid_indices(rows, cols, wrap_rows=False, wrap_cols=False, offset=0):
+    """ uint32 triangle list over a rows x cols vertex grid numbered offset + i * cols + j,
+        two triangles per quad, a wrapped direction closing its seam back onto row / column 0 """
+    i = np.arange(rows if wrap_rows else rows - 1, dtype=np.uint32)
+    j = np.arange(cols if wrap_cols else cols - 1, dtype=np.uint32)
+    row = np.stack([i * cols, (i + 1) % rows * cols]) + np.uint32(offset)  # this and the next row
+    col = np.stack([j, (j + 1) % cols])  # this and the next column
+
+    # corners (row, column) of the triangles (curr1, curr2, next2) and (next1, curr1, next2), one
+    # broadcast add of a (rows, 1, 6) and a (1, cols, 6) table
+    rows_of, cols_of = [0, 1, 1, 0, 0, 1], [0, 0, 1, 1, 0, 1]
+    quads = row.T[:, None, rows_of] + col.T[None, :, cols_of]
+    return quads.reshape(-1)
+
+
+def fan_indices(apex, ring, flip=False, wrap=True):
+    """ uint32 triangles joining 'apex' to each edge of the 'ring' of vertex indices, (apex, ring[k], ring[k + 1])
+        or (apex, ring[k + 1], ring[k]) when flipped; without wrap the last edge back to ring[0] is left out """
+    ring = np.asarray(ring, dtype=np.int64)
+    current, following = (ring, np.roll(ring, -1)) if wrap else (ring[:-1], ring[1:])
+    edges = (following, current) if flip else (current, following)
+    return np.column_stack([np.full(len(current), apex), *edges]).astype(np.uint32)
+
+
+def ring_points(nsegments, radius=1.0, closed=False):
+    """ (n, 2) float64 radius * (cos θ, sin θ) at θ = 2π i / n, plus the first point again at θ = 2π when closed """
+    theta = 2.0 * np.pi * np.arange(nsegments + 1 if closed else nsegments) / nsegments
+    return radius * np.column_stack((np.cos(theta), np.sin(theta)))
+
+
+def extrusion(nsegments, radius, height, offsets=((0.0, 0.0, 0.0),)):
+    """ float32 vertices, normals and uint32 indices of capped cylinders along +y, one per (x, _, z) offset,
+        each laid out as bottom center, top center, bottom ring, top ring (2 + 2 * nsegments vertices) """
+    offsets = np.asarray(offsets, dtype=np.float64).reshape(-1, 3)
+    n, per = nsegments, 2 + 2 * nsegments
+    ring, unit = ring_points(n, radius), ring_points(n)
+
+    # one cylinder in float64, shifted per offset on the way into float32
+    x = np.concatenate(([0.0, 0.0], ring[:, 0], ring[:, 0]))
+    z = np.concatenate(([0.0, 0.0], ring[:, 1], ring[:, 1]))
+    vertices = np.empty((len(offsets), per, 3), dtype=np.float32)
+    vertices[..., 0] = offsets[:, :1] + x
+    vertices[..., 1] = np.repeat([0.0, height, 0.0, height], [1, 1, n, n])
+    vertices[..., 2] = offsets[:, 2:] + z
+
+    # caps face down / up, the sides radially out (unit length already, no renormalizing)
+    normals = np.zeros((per, 3), dtype=np.float32)
+    normals[:2, 1] = (-1.0, 1.0)
+    normals[2:, 0], normals[2:, 2] = np.tile(unit[:, 0], 2), np.tile(unit[:, 1], 2)
+
+    # bottom fan, top fan, then two triangles (bottom1, top1, bottom2), (bottom2, top1, top2) per side quad
+    bottom, top = 2 + np.arange(n), 2 + n + np.arange(n)
+    sides = np.column_stack((bottom, top, np.roll(bottom, -1), np.roll(bottom, -1), top, np.roll(top, -1)))
+    pattern = np.concatenate((fan_indices(0, bottom).ravel(), fan_indices(1, top, flip=True).ravel(), sides.ravel()))
+    indices = pattern[None, :] + per * np.arange(len(offsets))[:, None]
+    return vertices.reshape(-1, 3), np.tile(normals, (len(offsets), 1)), indices.astype(np.uint32).ravel()
+
+
+def palette_colors(count, palette):
+    """ (count, 3) float32 colors cycling through 'palette' """
+    palette = np.asarray(palette, dtype=np.float32)
+    return np.tile(palette, (-(-count // len(palette)), 1))[:count]
@@ -0,0 +1,122 @@
+import ctypes
+
+import numpy as np
+import OpenGL.GL as GL
+
+from .buffer import UManager
+from .shader import SHADER_REGISTRY
+from .state import GL_STATE
+
+
+class PickingBuffer(object):
+    """
+    Offscreen R32UI target the scene is drawn into with one id per object, for GPU
+    picking. render() draws the requested region and starts an asynchronous read of
+    it into a pixel buffer object behind a fence; poll() hands the objects over once
+    the fence has signaled, normally on the next frame, so the main loop never waits
+    on glReadPixels.
+    """
+
+    def __init__(self):
+        self.size = (0, 0)
+        self.fbo = GL.glGenFramebuffers(1)
+        self.color, self.depth = GL.glGenRenderbuffers(2)
+        self.pbo = GL.glGenBuffers(1)
+        self.shader = SHADER_REGISTRY.acquire("pick")
+        self.uma = UManager(self.shader)
+        self.region = None  # (x, y, width, height) in framebuffer pixels, for the next render()
+        self.pending = None  # (fence, number of pixels, objects by id - 1) of the read in flight
+
+    def resize(self, width, height):
+        GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, self.color)
+        GL.glRenderbufferStorage(GL.GL_RENDERBUFFER, GL.GL_R32UI, width, height)
+        GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, self.depth)
+        GL.glRenderbufferStorage(GL.GL_RENDERBUFFER, GL.GL_DEPTH_COMPONENT24, width, height)
+        GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, 0)
+
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.fbo)
+        GL.glFramebufferRenderbuffer(GL.GL_FRAMEBUFFER, GL.GL_COLOR_ATTACHMENT0, GL.GL_RENDERBUFFER, self.color)
+        GL.glFramebufferRenderbuffer(GL.GL_FRAMEBUFFER, GL.GL_DEPTH_ATTACHMENT, GL.GL_RENDERBUFFER, self.depth)
+        if GL.glCheckFramebufferStatus(GL.GL_FRAMEBUFFER) != GL.GL_FRAMEBUFFER_COMPLETE:
+            print("[ERROR::lib.picking.PickingBuffer] incomplete picking framebuffer")
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0)
+        self.size = (width, height)
+
+    def request(self, x, y, width=1, height=1):
+        """Pick the objects covering the region with bottom-left pixel (x, y) on the next render()"""
+        self.region = (int(x), int(y), max(int(width), 1), max(int(height), 1))
+
+    def render(self, scene, projection, view, size):
+        """Draw the ids of the objects of 'scene' if a region was requested and no read is in flight"""
+        if self.region is None or self.pending is not None:
+            return
+        if tuple(size) != self.size:
+            self.resize(*size)
+
+        # clip the region to the framebuffer, the scissor keeps the pass to those pixels
+        x, y, width, height = self.region
+        x0, y0 = np.clip([x, y], 0, np.subtract(size, 1))
+        x1, y1 = np.clip([x + width, y + height], 1, size)
+        width, height = int(max(x1 - x0, 1)), int(max(y1 - y0, 1))
+        self.region = None
+
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.fbo)
+        GL.glViewport(0, 0, *size)
+        GL_STATE.set_capability(GL.GL_SCISSOR_TEST, True)
+        GL.glScissor(int(x0), int(y0), width, height)
+        GL.glClearBufferuiv(GL.GL_COLOR, 0, np.zeros(4, dtype=np.uint32))
+        GL.glClear(GL.GL_DEPTH_BUFFER_BIT)
+        GL_STATE.set_polygon_mode(GL.GL_FILL)
+
+        # the scene's own VAOs and instance buffers, ids numbered in draw order from 1
+        self.shader.use()
+        objects = []
+        visible, models, groups = scene.visible_groups(projection, view)
+        for group in groups:
+            visible[group[0]].drawable.draw_ids(self.uma, view, models[group], len(objects) + 1)
+            objects.extend(visible[index] for index in group)
+
+        # into the PBO: glReadPixels returns at once, the copy completes behind the fence
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, self.pbo)
+        GL.glBufferData(GL.GL_PIXEL_PACK_BUFFER, width * height * 4, None, GL.GL_STREAM_READ)
+        GL.glReadPixels(int(x0), int(y0), width, height, GL.GL_RED_INTEGER, GL.GL_UNSIGNED_INT, ctypes.c_void_p(0))
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, 0)
+        self.pending = (GL.glFenceSync(GL.GL_SYNC_GPU_COMMANDS_COMPLETE, 0), width * height, objects)
+
+        GL_STATE.set_capability(GL.GL_SCISSOR_TEST, False)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0)
+        GL.glViewport(0, 0, *size)
+
+    def poll(self):
+        """Objects found in the last rendered region once its read has completed, None until then"""
+        if self.pending is None:
+            return None
+        fence, npixels, objects = self.pending
+        if GL.glClientWaitSync(fence, GL.GL_SYNC_FLUSH_COMMANDS_BIT, 0) == GL.GL_TIMEOUT_EXPIRED:
+            return None
+        GL.glDeleteSync(fence)
+        self.pending = None
+
+        ids = np.empty(npixels, dtype=np.uint32)
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, self.pbo)
+        pointer = GL.glMapBufferRange(GL.GL_PIXEL_PACK_BUFFER, 0, ids.nbytes, GL.GL_MAP_READ_BIT)
+        ctypes.memmove(ids.ctypes.data, pointer, ids.nbytes)
+        GL.glUnmapBuffer(GL.GL_PIXEL_PACK_BUFFER)
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, 0)
+
+        ids = np.unique(ids)
+        return [objects[object_id - 1] for object_id in ids[(ids > 0) & (ids <= len(objects))]]
+
+    def destroy(self):
+        try:
+            if self.pending is not None:
+                GL.glDeleteSync(self.pending[0])
+                self.pending = None
+            if getattr(self, "fbo", None):
+                GL.glDeleteFramebuffers(1, [self.fbo])
+                GL.glDeleteRenderbuffers(2, [self.color, self.depth])
+                GL.glDeleteBuffers(1, [self.pbo])
+                self.fbo = None
+            SHADER_REGISTRY.release(self.shader)
+        except Exception:
+            pass
@@ -0,0 +1,92 @@
+HANDLE_BITS = 32  # low bits of a handle hold the slot, the high bits its generation
+SLOT_MASK = (1 << HANDLE_BITS) - 1
+
+
+class SlotMap(object):
+    """
+    Container handing out stable integer handles. Values live densely in 'values'
+    (index i owned by 'handles[i]') and a removal moves the last value into the hole,
+    so iteration stays a plain list walk and insert / remove are O(1). A handle names
+    a slot plus the slot's generation; removing bumps the generation and puts the slot
+    on the free list, so an old handle to a reused slot is recognized as stale.
+    """
+
+    def __init__(self):
+        self.values = []  # dense
+        self.handles = []  # dense index -> handle
+        self.dense = []  # slot -> dense index, -1 while free
+        self.generations = []  # slot -> generation
+        self.free = []  # slots ready for reuse
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __contains__(self, handle):
+        return self.index(handle) is not None
+
+    def __getitem__(self, handle):
+        index = self.index(handle)
+        if index is None:
+            raise KeyError(f"stale or unknown handle {handle:#x}")
+        return self.values[index]
+
+    def items(self):
+        """(handle, value) pairs in dense order"""
+        return zip(self.handles, self.values)
+
+    def get(self, handle, default=None):
+        index = self.index(handle)
+        return default if index is None else self.values[index]
+
+    def index(self, handle):
+        """Dense index of a live handle, None for a stale or unknown one"""
+        if handle is None:
+            return None
+        slot = handle & SLOT_MASK
+        if slot >= len(self.dense) or self.generations[slot] != handle >> HANDLE_BITS:
+            return None
+        index = self.dense[slot]
+        return index if index >= 0 else None
+
+    def insert(self, value):
+        if self.free:
+            slot = self.free.pop()
+        else:
+            slot = len(self.dense)
+            self.dense.append(-1)
+            self.generations.append(0)
+        handle = (self.generations[slot] << HANDLE_BITS) | slot
+        self.dense[slot] = len(self.values)
+        self.values.append(value)
+        self.handles.append(handle)
+        return handle
+
+    def remove(self, handle):
+        """Remove and return the value of a live handle, the last value moves into its place"""
+        index = self.index(handle)
+        if index is None:
+            raise KeyError(f"stale or unknown handle {handle:#x}")
+        value = self.values[index]
+        last_value, last_handle = self.values.pop(), self.handles.pop()
+        if index < len(self.values):
+            self.values[index], self.handles[index] = last_value, last_handle
+            self.dense[last_handle & SLOT_MASK] = index
+
+        slot = handle & SLOT_MASK
+        self.dense[slot] = -1
+        self.generations[slot] += 1  # outstanding copies of the handle go stale
+        self.free.append(slot)
+        return value
+
+    def clear(self):
+        """Remove everything, every handle handed out so far goes stale"""
+        for handle in self.handles:
+            slot = handle & SLOT_MASK
+            self.dense[slot] = -1
+            self.generations[slot] += 1
+            self.free.append(slot)
+        self.values.clear()
+        self.handles.clear()
@@ -0,0 +1,38 @@
+import sys
+import time
+
+# optional dependencies that must stay out of startup, see the report
+DEFERRED_MODULES = ["cv2", "pandas", "pyassimp", "sympy", "tkinter"]
+
+
+class StartupTimer(object):
+    """
+    Wall-clock marks from the import of this module, first thing in main.py, to the
+    first presented frame. report() prints them once, with any deferred module that
+    was loaded anyway, so a regression in cold start shows on every launch.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = []  # (name, seconds since start)
+        self.reported = False
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter() - self.start))
+
+    def report(self):
+        if self.reported:
+            return
+        self.reported = True
+        steps, last = [], 0.0
+        for name, elapsed in self.marks:
+            steps.append("%s %.0f ms" % (name, (elapsed - last) * 1000))
+            last = elapsed
+        loaded = [name for name in DEFERRED_MODULES if name in sys.modules]
+        print(
+            "[INFO::lib.startup.StartupTimer] %.0f ms to first frame (%s), deferred modules loaded: %s"
+            % (last * 1000, ", ".join(steps), ", ".join(loaded) or "none")
+        )
+
+
+STARTUP = StartupTimer()
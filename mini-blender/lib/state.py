@@ -0,0 +1,82 @@
+import OpenGL.GL as GL
+
+
+class GLState(object):
+    """
+    Shadow copy of the GL state touched by the draw code. Every setter compares
+    against the value it last sent and only reaches the driver on a change, so
+    the draw loop never has to query GL (glIsEnabled, glGetIntegerv) to restore it.
+    Code that changes this state behind the tracker's back (the imgui renderer)
+    must be followed by invalidate().
+    """
+
+    def __init__(self):
+        self.changes = 0  # calls sent to the driver
+        self.skipped = 0  # redundant calls filtered out
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget the shadowed values, the next call of every setter is sent as is"""
+        self.capabilities = {}
+        self.polygon_mode = None
+        self.program = None
+        self.vao = None
+        self.active_unit = None
+        self.textures = {}  # texture unit -> (target, texture)
+
+    def set_capability(self, capability, enabled):
+        enabled = bool(enabled)
+        if self.capabilities.get(capability) == enabled:
+            self.skipped += 1
+            return
+        (GL.glEnable if enabled else GL.glDisable)(capability)
+        self.capabilities[capability] = enabled
+        self.changes += 1
+
+    def set_cull_face(self, enabled):
+        self.set_capability(GL.GL_CULL_FACE, enabled)
+
+    def set_depth_test(self, enabled):
+        self.set_capability(GL.GL_DEPTH_TEST, enabled)
+
+    def set_polygon_mode(self, mode):
+        if self.polygon_mode == mode:
+            self.skipped += 1
+            return
+        GL.glPolygonMode(GL.GL_FRONT_AND_BACK, mode)
+        self.polygon_mode = mode
+        self.changes += 1
+
+    def use_program(self, program):
+        if self.program == program:
+            self.skipped += 1
+            return
+        GL.glUseProgram(program)
+        self.program = program
+        self.changes += 1
+
+    def bind_vao(self, vao):
+        if self.vao == vao:
+            self.skipped += 1
+            return
+        GL.glBindVertexArray(vao)
+        self.vao = vao
+        self.changes += 1
+
+    def active_texture(self, unit):
+        if self.active_unit == unit:
+            return  # only a selector, not counted
+        GL.glActiveTexture(GL.GL_TEXTURE0 + unit)
+        self.active_unit = unit
+
+    def bind_texture(self, unit, texture, target=GL.GL_TEXTURE_2D):
+        if self.textures.get(unit) == (target, texture):
+            self.skipped += 1
+            return
+        self.active_texture(unit)
+        GL.glBindTexture(target, texture)
+        self.textures[unit] = (target, texture)
+        self.changes += 1
+
+
+GL_STATE = GLState()
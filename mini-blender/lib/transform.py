@@ -35,6 +35,11 @@ def identity():
     return np.identity(4, 'f')
 
 
+def normal_matrix(modelview):
+    """ 3x3 inverse-transpose of the linear part of 'modelview' (or of a stack of them), for normals """
+    return np.linalg.inv(np.asarray(modelview, 'f')[..., :3, :3]).swapaxes(-1, -2).astype('f')
+
+
 def ortho(left, right, bot, top, near, far):
     """ orthogonal projection matrix for OpenGL """
     dx, dy, dz = right - left, top - bot, far - near
@@ -73,16 +78,14 @@ def frustum(xmin, xmax, ymin, ymax, zmin, zmax):
 
 def translate(x=0.0, y=0.0, z=0.0):
     """ matrix to translate from coordinates (x,y,z) or a vector x"""
-    matrix = np.identity(4, 'f')
-    matrix[:3, 3] = vec(x, y, z) if isinstance(x, Number) else vec(x)
-    return matrix
+    return translate_batch((vec(x, y, z) if isinstance(x, Number) else vec(x))[None])[0]
 
 
 def scale(x, y=None, z=None):
     """scale matrix, with uniform (x alone) or per-dimension (x,y,z) factors"""
     x, y, z = (x, y, z) if isinstance(x, Number) else (x[0], x[1], x[2])
     y, z = (x, x) if y is None or z is None else (y, z)  # uniform scaling
-    return np.diag((x, y, z, 1))
+    return scale_batch(vec(x, y, z)[None])[0]
 
 
 def sincos(degrees=0.0, radians=None):
@@ -93,25 +96,14 @@ def sincos(degrees=0.0, radians=None):
 
 def rotate(axis=(1., 0., 0.), angle=0.0, radians=None):
     """ 4x4 rotation matrix around 'axis' with 'angle' degrees or 'radians' """
-    x, y, z = normalized(vec(axis))
-    s, c = sincos(angle, radians)
-    nc = 1 - c
-    return np.array([[x*x*nc + c,   x*y*nc - z*s, x*z*nc + y*s, 0],
-                     [y*x*nc + z*s, y*y*nc + c,   y*z*nc - x*s, 0],
-                     [x*z*nc - y*s, y*z*nc + x*s, z*z*nc + c,   0],
-                     [0,            0,            0,            1]], 'f')
+    radians = radians if radians else math.radians(angle)
+    return rotate_batch(vec(axis)[None], vec(radians)[None])[0]
 
 
 def lookat(eye, target, up):
     """ Computes 4x4 view matrix from 3d point 'eye' to 'target',
         'up' 3d vector fixes orientation """
-    view = normalized(vec(target)[:3] - vec(eye)[:3])
-    up = normalized(vec(up)[:3])
-    right = np.cross(view, up)
-    up = np.cross(right, view)
-    rotation = np.identity(4)
-    rotation[:3, :3] = np.vstack([right, up, -view])
-    return rotation @ translate(-eye)
+    return lookat_batch(vec(eye)[None, :3], vec(target)[None, :3], vec(up)[None, :3])[0]
 
 
 # quaternion functions -------------------------------------------------------
@@ -138,39 +130,133 @@ def quaternion_from_euler(yaw=0.0, pitch=0.0, roll=0.0, radians=None):
 
 def quaternion_mul(q1, q2):
     """ Compute quaternion which composes rotations of two quaternions """
-    return np.dot(np.array([[q1[0], -q1[1], -q1[2], -q1[3]],
-                            [q1[1],  q1[0], -q1[3],  q1[2]],
-                            [q1[2],  q1[3],  q1[0], -q1[1]],
-                            [q1[3], -q1[2],  q1[1],  q1[0]]]), q2)
+    return quaternion_mul_batch(vec(q1)[None], vec(q2)[None])[0]
 
 
 def quaternion_matrix(q):
     """ Create 4x4 rotation matrix from quaternion q """
-    q = normalized(q)  # only unit quaternions are valid rotations.
-    nxx, nyy, nzz = -q[1]*q[1], -q[2]*q[2], -q[3]*q[3]
-    qwx, qwy, qwz = q[0]*q[1], q[0]*q[2], q[0]*q[3]
-    qxy, qxz, qyz = q[1]*q[2], q[1]*q[3], q[2]*q[3]
-    return np.array([[2*(nyy + nzz)+1, 2*(qxy - qwz),   2*(qxz + qwy),   0],
-                     [2 * (qxy + qwz), 2 * (nxx + nzz) + 1, 2 * (qyz - qwx), 0],
-                     [2 * (qxz - qwy), 2 * (qyz + qwx), 2 * (nxx + nyy) + 1, 0],
-                     [0, 0, 0, 1]], 'f')
+    return quaternion_matrix_batch(vec(q)[None])[0]
 
 
 def quaternion_slerp(q0, q1, fraction):
     """ Spherical interpolation of two quaternions by 'fraction' """
+    return quaternion_slerp_batch(vec(q0)[None], vec(q1)[None], fraction)[0]
+
+
+# batched variants ------------------------------------------------------------
+# Each takes (n,...) arrays and returns float32 (n,...) results, written into 'out'
+# when given so that per-frame callers can reuse one buffer; 'out' must not
+# overlap the inputs. The single-value functions above are thin wrappers.
+def _normalized_rows(vectors):
+    """ rows of 'vectors' scaled to unit length, zero rows left as they are """
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0., norms, 1.)
+
+
+def _affine_out(count, out):
+    """ 'out' (or a new (count,4,4) array) with its last row set to 0 0 0 1 """
+    out = np.empty((count, 4, 4), 'f') if out is None else out
+    out[:, 3, :3] = 0
+    out[:, 3, 3] = 1
+    return out
+
+
+def translate_batch(offsets, out=None):
+    """ (n,4,4) translation matrices from (n,3) offsets """
+    offsets = np.asarray(offsets, 'f').reshape(-1, 3)
+    out = _affine_out(len(offsets), out)
+    out[:, :3, :3] = np.identity(3, 'f')
+    out[:, :3, 3] = offsets
+    return out
+
+
+def scale_batch(factors, out=None):
+    """ (n,4,4) scale matrices from (n,3) per-axis or (n,) uniform factors """
+    factors = np.asarray(factors, 'f')
+    factors = np.repeat(factors[:, None], 3, axis=1) if factors.ndim == 1 else factors
+    out = _affine_out(len(factors), out)
+    out[:, :3, :] = 0
+    out[:, [0, 1, 2], [0, 1, 2]] = factors
+    return out
+
+
+def rotate_batch(axes, radians, out=None):
+    """ (n,4,4) rotations around (n,3) axes by (n,) angles in radians """
+    x, y, z = _normalized_rows(np.asarray(axes, 'f').reshape(-1, 3)).T
+    s, c = np.sin(radians, dtype='f'), np.cos(radians, dtype='f')
+    nc = 1 - c
+    out = _affine_out(len(x), out)
+    out[:, 0, 0], out[:, 0, 1], out[:, 0, 2] = x*x*nc + c,   x*y*nc - z*s, x*z*nc + y*s
+    out[:, 1, 0], out[:, 1, 1], out[:, 1, 2] = y*x*nc + z*s, y*y*nc + c,   y*z*nc - x*s
+    out[:, 2, 0], out[:, 2, 1], out[:, 2, 2] = x*z*nc - y*s, y*z*nc + x*s, z*z*nc + c
+    out[:, :3, 3] = 0
+    return out
+
+
+def lookat_batch(eyes, targets, ups, out=None):
+    """ (n,4,4) view matrices from (n,3) eyes looking at (n,3) targets """
+    eyes = np.asarray(eyes, 'f').reshape(-1, 3)
+    view = _normalized_rows(np.asarray(targets, 'f').reshape(-1, 3) - eyes)
+    up = _normalized_rows(np.asarray(ups, 'f').reshape(-1, 3))
+    right = np.cross(view, up)
+    up = np.cross(right, view)
+    out = _affine_out(len(eyes), out)
+    out[:, 0, :3], out[:, 1, :3], out[:, 2, :3] = right, up, -view
+    out[:, :3, 3] = -np.einsum('nij,nj->ni', out[:, :3, :3], eyes)
+    return out
+
+
+def quaternion_matrix_batch(quaternions, out=None):
+    """ (n,4,4) rotation matrices from (n,4) quaternions, normalized here """
+    w, x, y, z = _normalized_rows(np.asarray(quaternions, 'f').reshape(-1, 4)).T
+    out = _affine_out(len(w), out)
+    out[:, 0, 0], out[:, 0, 1], out[:, 0, 2] = 1 - 2*(y*y + z*z), 2*(x*y - w*z), 2*(x*z + w*y)
+    out[:, 1, 0], out[:, 1, 1], out[:, 1, 2] = 2*(x*y + w*z), 1 - 2*(x*x + z*z), 2*(y*z - w*x)
+    out[:, 2, 0], out[:, 2, 1], out[:, 2, 2] = 2*(x*z - w*y), 2*(y*z + w*x), 1 - 2*(x*x + y*y)
+    out[:, :3, 3] = 0
+    return out
+
+
+def quaternion_mul_batch(q1, q2, out=None):
+    """ (n,4) quaternions composing the rotations of (n,4) q1 and q2 """
+    w1, x1, y1, z1 = np.asarray(q1, 'f').reshape(-1, 4).T
+    w2, x2, y2, z2 = np.asarray(q2, 'f').reshape(-1, 4).T
+    out = np.empty((len(w1), 4), 'f') if out is None else out
+    out[:, 0] = w1*w2 - x1*x2 - y1*y2 - z1*z2
+    out[:, 1] = x1*w2 + w1*x2 - z1*y2 + y1*z2
+    out[:, 2] = y1*w2 + z1*x2 + w1*y2 - x1*z2
+    out[:, 3] = z1*w2 - y1*x2 + x1*y2 + w1*z2
+    return out
+
+
+def quaternion_slerp_batch(q0, q1, fraction, out=None):
+    """ (n,4) spherical interpolations of (n,4) quaternions by scalar or (n,) 'fraction' """
     # only unit quaternions are valid rotations.
-    q0, q1 = normalized(q0), normalized(q1)
-    dot = np.dot(q0, q1)
+    q0 = _normalized_rows(np.asarray(q0, 'f').reshape(-1, 4))
+    q1 = _normalized_rows(np.asarray(q1, 'f').reshape(-1, 4))
+    dot = np.einsum('ni,ni->n', q0, q1)
 
     # if negative dot product, the quaternions have opposite handedness
     # and slerp won't take the shorter path. Fix by reversing one quaternion.
-    q1, dot = (q1, dot) if dot > 0 else (-q1, -dot)
+    flip = np.where(dot > 0, 1, -1).astype('f')
+    q1, dot = q1 * flip[:, None], dot * flip
+
+    theta = np.arccos(np.clip(dot, -1, 1)) * np.asarray(fraction, 'f')  # angle between q0 and result
+    q2 = _normalized_rows(q1 - q0 * dot[:, None])                        # {q0, q2} now orthonormal basis
+
+    out = np.empty(q0.shape, 'f') if out is None else out
+    np.multiply(q0, np.cos(theta)[:, None], out=out)
+    out += q2 * np.sin(theta)[:, None]
+    return out
 
-    theta_0 = math.acos(np.clip(dot, -1, 1))  # angle between input vectors
-    theta = theta_0 * fraction                # angle between q0 and result
-    q2 = normalized(q1 - q0*dot)              # {q0, q2} now orthonormal basis
 
-    return q0*math.cos(theta) + q2*math.sin(theta)
+def model_matrices(positions, rotations, scales, out=None):
+    """ (n,4,4) translate @ rotate @ scale matrices from (n,3) positions,
+        (n,4) quaternions (normalized here) and (n,3) scale factors """
+    out = quaternion_matrix_batch(rotations, out)
+    out[:, :3, :3] *= np.asarray(scales, 'f')[:, None, :]  # scale columns = scale before rotating
+    out[:, :3, 3] = positions
+    return out
 
 
 # a trackball class based on provided quaternion functions -------------------
@@ -1,3 +1,5 @@
+from lib.startup import STARTUP  # first, so the startup report covers every import
+
 import os
 
 # os.environ["GDK_BACKEND"] = "x11"
@@ -5,12 +7,15 @@ import glfw
 from app.viewer import Viewer
 from objects import *
 
+STARTUP.mark("imports")
+
 
 def main():
     """create windows, add shaders & scene objects, then run rendering loop"""
     viewer = Viewer()
     scene = viewer.scene
     scene.add(Torus().setup())
+    STARTUP.mark("scene")
     viewer.run()
 
 
@@ -1,3 +1,5 @@
+import importlib
+
 from .triangle import Triangle
 from .rectangle import Rectangle
 from .pentagon import Pentagon
@@ -15,9 +17,22 @@ from .cylinder import Cylinder
 from .tetrahedron import Tetrahedron
 from .torus import Torus
 
-from .custom import CustomModel
-from .equation import Equation
+# loaded on first access, they pull in pyassimp and sympy
+LAZY_OBJECTS = {
+    "CustomModel": ".custom",
+    "Equation": ".equation",
+}
+
+
+def __getattr__(name):
+    if name not in LAZY_OBJECTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(LAZY_OBJECTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
 
+# "from objects import *" leaves out LAZY_OBJECTS, import them by name
 __all__ = [
     "Triangle",
     "Rectangle",
@@ -35,6 +50,4 @@ __all__ = [
     "Tetrahedron",
     "Torus",
     # "Prism",
-    "CustomModel",
-    "Equation",
 ]
@@ -1,35 +1,70 @@
+import copy
 import ctypes
 import numpy as np
-from lib.buffer import UManager, VAO
-from lib.shader import Shader
+from lib.bounds import bounding_box, bounding_sphere
+from lib.buffer import GEOMETRY_CACHE, UManager, VAO
+from lib.bvh import TriangleBVH
+from lib.shader import SHADER_REGISTRY
+from lib.state import GL_STATE
+from lib.transform import normal_matrix
 import OpenGL.GL as GL
 from objects.colors import Color
-from lib.config import (
-    GLOBAL_I_LIGHT,
-    GLOBAL_K_MATERIALS,
-    GLOBAL_SHININESS,
-    GLOBAL_LIGHT_POS,
-)
+
+
+def _cache_key(value):
+    """
+    Hashable stand-in for constructor arguments, equal only for equal values: arrays by dtype,
+    shape and bytes (their repr elides the middle), lists, tuples and dicts element-wise;
+    TypeError for anything else unhashable
+    """
+    if isinstance(value, np.ndarray):
+        return ("ndarray", value.dtype.str, value.shape, value.tobytes())
+    if isinstance(value, (list, tuple)):
+        return tuple(_cache_key(item) for item in value)
+    if isinstance(value, dict):
+        items = sorted(value.items(), key=lambda item: repr(item[0]))
+        return ("dict",) + tuple((_cache_key(name), _cache_key(item)) for name, item in items)
+    hash(value)
+    return value
 
 
 class Drawable:
+    # vertex formats per attribute location (position, color, normal):
+    # 36 bytes/vertex in full precision, 16 bytes/vertex compact
+    FORMATS = {0: "float3", 1: "float3", 2: "float3"}
+    COMPACT_FORMATS = {0: "half4", 1: "ubyte4", 2: "int_2_10_10_10_rev"}
+    # per-instance model matrix (4 x vec4 columns) and eye-space normal matrix (3 x vec3 columns)
+    INSTANCE_COLUMNS = [(4, 4), (5, 4), (6, 4), (7, 4), (8, 3), (9, 3), (10, 3)]
+    instanceable = True
+
     def __init__(self, shader_type: str):
         self.vertices: np.ndarray = None
         self.normals: np.ndarray = None
         self.indices: np.ndarray = None
-        self.colors = np.ndarray = None
+        self.colors: np.ndarray = None
 
         self.rendering_mode = "phong"
         self.culling = True
+        self.geometry_key = None  # set on drawables handed out by shared()
+        self.aabb = None  # local (min, max) corners, computed in setup()
+        self.bounding_sphere = None  # local (center, radius)
+        # (vertices, TriangleBVH) of the last pick; the dict is shared by the copies shared() hands out
+        self.picking = {}
+
+        # draw call: glDrawElements over all indices, or glDrawArrays(primitive, first, count)
+        self.use_ebo = True
+        self.primitive = GL.GL_TRIANGLES
+        self.first = 0
+        self.count = 0
 
         self.vao: VAO = VAO()
         # self.shader: Shader = Shader(shader_type)
         # self.uma: UManager = UManager(self.shader)
         self.shaders = {
-            "flat": Shader("flat"),
-            "gouraud": Shader("gouraud"),
-            "phong": Shader("phong"),
-            "texture": Shader("phong_texture"),
+            "flat": SHADER_REGISTRY.acquire("flat"),
+            "gouraud": SHADER_REGISTRY.acquire("gouraud"),
+            "phong": SHADER_REGISTRY.acquire("phong"),
+            "texture": SHADER_REGISTRY.acquire("phong_texture"),
         }
 
         self.uma = {
@@ -39,60 +74,106 @@ class Drawable:
             "texture": UManager(self.shaders["texture"]),
         }
 
-    def setup(self):
+    def setup(self, compact=False):
         # fmt: off
-        self.vao.add_vbo(0, self.vertices, ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None,)
-        self.vao.add_vbo(1, self.colors, ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None,)
-        self.vao.add_vbo(2, self.normals, ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None,)
+        formats = self.COMPACT_FORMATS if compact else self.FORMATS
+        self.vao.add_interleaved({0: self.vertices, 1: self.colors, 2: self.normals}, formats)
         if self.indices is not None:
             self.vao.add_ebo(self.indices)
-
-        for shader, uma in zip(self.shaders.values(), self.uma.values()):
-            GL.glUseProgram(shader.render_idx)
-            uma.upload_uniform_matrix3fv(GLOBAL_I_LIGHT, "I_light", False)
-            uma.upload_uniform_vector3fv(GLOBAL_LIGHT_POS, "light_pos")
-            uma.upload_uniform_matrix3fv(GLOBAL_K_MATERIALS, "K_materials", False)
-            uma.upload_uniform_scalar1f(GLOBAL_SHININESS, "shininess")
-            uma.upload_uniform_scalar1i(1, "mode")
+        self.compute_bounds(self.vertices)
+        # camera and light uniforms live in the per-frame FrameUBO
         return self
 
-    def draw(
-        self,
-        projection,
-        view,
-        model,
-        use_ebo=True,
-        mode=GL.GL_TRIANGLES,
-        begin=0,
-        num=0,
-    ):
+    def compute_bounds(self, vertices):
+        self.aabb = bounding_box(vertices)
+        self.bounding_sphere = bounding_sphere(vertices)
+
+    def triangles(self):
+        """(n, 3) vertex indices of the triangles the draw call rasterizes, strips and fans unrolled"""
+        if self.use_ebo:
+            indices = np.asarray(self.indices, dtype=np.int64).ravel()
+        else:
+            indices = np.arange(self.first, self.first + self.count)
+        if self.primitive == GL.GL_TRIANGLES:
+            return indices[: len(indices) // 3 * 3].reshape(-1, 3)
+        ntriangles = max(len(indices) - 2, 0)
+        if self.primitive == GL.GL_TRIANGLE_STRIP:
+            return np.stack([indices[:ntriangles], indices[1 : ntriangles + 1], indices[2:]], axis=1)
+        if self.primitive == GL.GL_TRIANGLE_FAN:
+            return np.stack([np.repeat(indices[0], ntriangles), indices[1 : ntriangles + 1], indices[2:]], axis=1)
+        return np.zeros((0, 3), dtype=np.int64)  # points and lines cannot be picked
+
+    def picking_bvh(self):
+        """Triangle BVH of the local geometry, built on the first pick"""
+        vertices, bvh = self.picking.get("bvh", (None, None))
+        if vertices is not self.vertices:  # first pick, or the geometry was replaced since
+            bvh = TriangleBVH(self.vertices, self.triangles())
+            self.picking["bvh"] = (self.vertices, bvh)
+        return bvh
+
+    def draw(self, projection, view, model):
         # fmt: off
-        modelview = view @ model
         uma = self.uma[self.rendering_mode]
+        self.shaders[self.rendering_mode].use()
+        uma.upload_uniform_scalar1i(0, "instanced")
+        uma.upload_uniform_matrix4fv(model, "model", True)
+        if uma.get_uniform_location("normal_matrix") >= 0:
+            uma.upload_uniform_matrix3fv(normal_matrix(view @ model), "normal_matrix", True)
 
-        uma.upload_uniform_matrix4fv(projection, "projection", True)
-        uma.upload_uniform_matrix4fv(modelview, "modelview", True)
-        light_pos_eye4 = view @ np.array([GLOBAL_LIGHT_POS[0], GLOBAL_LIGHT_POS[1], GLOBAL_LIGHT_POS[2], 1.0], dtype=np.float32)
-        uma.upload_uniform_vector3fv(light_pos_eye4[:3], "light_pos")
-
+        # state changes go through the tracker, the VAO stays bound for the next draw
         self.vao.activate()
-        prev_cull = GL.glIsEnabled(GL.GL_CULL_FACE)
-        if self.culling:
-            GL.glEnable(GL.GL_CULL_FACE)
-        else:
-            GL.glDisable(GL.GL_CULL_FACE)
+        GL_STATE.set_cull_face(self.culling)
 
-        if use_ebo:
-            GL.glDrawElements(mode, int(self.indices.size), GL.GL_UNSIGNED_INT, ctypes.c_voidp(0))
+        if self.use_ebo:
+            GL.glDrawElements(self.primitive, int(self.indices.size), GL.GL_UNSIGNED_INT, ctypes.c_voidp(0))
         else:
-            GL.glDrawArrays(mode, begin, num)
+            GL.glDrawArrays(self.primitive, self.first, self.count)
 
-        if prev_cull:
-            GL.glEnable(GL.GL_CULL_FACE)
+    def draw_instanced(self, projection, view, models):
+        """One draw call for a (n, 4, 4) stack of model matrices sharing this drawable's VAO"""
+        # fmt: off
+        self.upload_instances(view, models)
+        self.shaders[self.rendering_mode].use()
+        self.uma[self.rendering_mode].upload_uniform_scalar1i(1, "instanced")
+        self.vao.activate()
+        GL_STATE.set_cull_face(self.culling)
+        self.draw_elements(len(models))
+
+    def draw_ids(self, uma, view, models, first_id):
+        """Draw a (n, 4, 4) stack of models into the picking buffer with the ids first_id + [0, n)"""
+        self.upload_instances(view, models)
+        uma.upload_uniform_scalar1i(1, "instanced")
+        uma.upload_uniform_scalar1i(first_id, "first_id")
+        self.vao.activate()
+        GL_STATE.set_cull_face(self.culling)
+        self.draw_elements(len(models))
+
+    def upload_instances(self, view, models):
+        # fmt: off
+        models = np.asarray(models, dtype=np.float32)
+        ninstances = len(models)
+        # column-major rows so each vec4 / vec3 attribute location reads one matrix column
+        instances = np.empty((ninstances, 25), dtype=np.float32)
+        instances[:, :16] = models.transpose(0, 2, 1).reshape(ninstances, 16)
+        instances[:, 16:] = normal_matrix(view @ models).transpose(0, 2, 1).reshape(ninstances, 9)
+        self.vao.update_instances(instances, self.INSTANCE_COLUMNS)
+
+    def draw_elements(self, ninstances):
+        # fmt: off
+        if self.use_ebo:
+            GL.glDrawElementsInstanced(self.primitive, int(self.indices.size), GL.GL_UNSIGNED_INT, ctypes.c_voidp(0), ninstances)
         else:
-            GL.glDisable(GL.GL_CULL_FACE)
+            GL.glDrawArraysInstanced(self.primitive, self.first, self.count, ninstances)
+
+    def state_key(self):
+        """(program, VAO, culling, texture) bound by this drawable's draw call, for the render queue"""
+        textures = self.uma[self.rendering_mode].textures
+        texture = textures[min(textures)]["id"] if textures else 0
+        return (self.shaders[self.rendering_mode].render_idx, self.vao.vao, self.culling, texture)
 
-        self.vao.deactivate()
+    def instance_key(self):
+        """Drawables with equal keys can be drawn together by draw_instanced"""
+        return (self.vao.vao, self.rendering_mode, self.culling)
 
     def set_rendering_mode(self, rendering_mode):
         if rendering_mode == "wireframe":
@@ -100,7 +181,28 @@ class Drawable:
             return
         self.rendering_mode = rendering_mode
 
+    @classmethod
+    def shared(cls, *args, compact=False, **kwargs):
+        """
+        Set-up drawable whose VAO is shared with every other cls(*args, **kwargs) from
+        shared(); the buffers are freed when the last of them is destroyed. 'compact' is
+        passed on to setup(); arguments without a hashable form get a drawable of their own
+        """
+        try:
+            key = _cache_key((cls, args, kwargs, compact))
+        except TypeError:
+            return cls(*args, **kwargs).setup(compact=compact)
+        prototype = GEOMETRY_CACHE.acquire(key, lambda: cls(*args, **kwargs).setup(compact=compact))
+        drawable = copy.copy(prototype)  # own per-object state, same geometry and VAO
+        drawable.shaders = {mode: SHADER_REGISTRY.acquire(shader.shader_type) for mode, shader in prototype.shaders.items()}
+        drawable.uma = {mode: UManager(shader) for mode, shader in drawable.shaders.items()}  # no textures of the prototype
+        drawable.geometry_key = key
+        return drawable
+
     def destroy(self):
-        self.vao.destroy()
+        if self.geometry_key is not None:
+            GEOMETRY_CACHE.release(self.geometry_key)
+        else:
+            self.vao.destroy()
         for shader in self.shaders.values():
-            shader.destroy()
+            SHADER_REGISTRY.release(shader)
@@ -21,6 +21,8 @@ class Arrow(Drawable):
         - head_width: Width of the arrow's head.
         """
         super().__init__(shader_type)
+        self.use_ebo = False
+        self.primitive = GL.GL_TRIANGLE_STRIP
 
         self.stem_length = stem_length
         self.stem_width = stem_width
@@ -35,17 +37,7 @@ class Arrow(Drawable):
             self.colors[i] = Color.all_colors[i % len(Color.all_colors)]
         self.normals = np.tile([0, 0, 1], (self.vertices.shape[0], 1)).astype(np.float32)
         self.normals = self.normals / np.linalg.norm(self.normals, axis=1, keepdims=True)
-
-    def draw(self, projection, view, model):
-        super().draw(
-            projection,
-            view,
-            model,
-            False,
-            GL.GL_TRIANGLE_STRIP,
-            0,
-            self.vertices.shape[0],
-        )
+        self.count = self.vertices.shape[0]
 
     def _generate_vertices(self):
         # fmt: off
@@ -8,6 +8,9 @@ class Circle(Drawable):
     def __init__(self, shader_type="phong", nsegments=32):
         # fmt: off
         super().__init__(shader_type)
+        self.use_ebo = False
+        self.primitive = GL.GL_TRIANGLE_FAN
+        self.count = nsegments + 2
         self.culling = False
 
         self.nsegments = nsegments
@@ -22,8 +25,3 @@ class Circle(Drawable):
             self.colors[i] = Color.all_colors[i % len(Color.all_colors)]
         self.normals = np.tile([0, 0, 1], (self.vertices.shape[0], 1)).astype(np.float32)
         self.normals = self.normals / np.linalg.norm(self.normals, axis=1, keepdims=True)
-
-    def draw(self, projection, view, model):
-        super().draw(
-            projection, view, model, False, GL.GL_TRIANGLE_FAN, 0, self.nsegments + 2
-        )
@@ -1,4 +1,5 @@
 import numpy as np
+from lib.mesh import fan_indices, palette_colors, ring_points
 from objects.colors import Color
 from objects.abstract import Drawable
 
@@ -20,51 +21,32 @@ class Cone(Drawable):
         self.vertices = self._generate_vertices()
         self.indices = self._generate_indexes()
         self.normals = self._generate_normals()
-        self.colors = np.zeros((self.vertices.shape[0], 3), dtype=np.float32)
-        for i in range(self.vertices.shape[0]):
-            self.colors[i] = Color.all_colors[i % len(Color.all_colors)]
+        self.colors = palette_colors(len(self.vertices), Color.all_colors)
 
     def _generate_vertices(self):
-        vertices = [[0.0, 0.0, 0.0], [0.0, self.height, 0.0]]  # base center and apex
-        for i in range(self.nsegments + 1):
-            theta = 2.0 * np.pi * i / self.nsegments
-            x = self.radius * np.cos(theta)
-            z = self.radius * np.sin(theta)
-            y = 0.0
-            vertices.append([x, y, z])
-
-        return np.array(vertices, dtype=np.float32)
+        # base center and apex, then the base ring closed by repeating its first point
+        ring = ring_points(self.nsegments, self.radius, closed=True)
+        vertices = np.zeros((self.nsegments + 3, 3), dtype=np.float32)
+        vertices[1, 1] = self.height
+        vertices[2:, 0], vertices[2:, 2] = ring[:, 0], ring[:, 1]
+        return vertices
 
     def _generate_indexes(self):
-        indices = []
-        # base
-        for i in range(self.nsegments):
-            indices.extend([0, i + 2, i + 3])
-        # side
-        for i in range(self.nsegments):
-            indices.extend([1, i + 3, i + 2])
-        return np.array(indices, dtype=np.uint32)
+        ring = np.arange(2, self.nsegments + 3)
+        base = fan_indices(0, ring, wrap=False)
+        side = fan_indices(1, ring, flip=True, wrap=False)
+        return np.concatenate((base.ravel(), side.ravel()))
 
     def _generate_normals(self):
         normals = np.zeros(self.vertices.shape, dtype=np.float32)
         # base and apex normal
         normals[0] = [0.0, -1.0, 0.0]
         normals[1] = [0.0, 1.0, 0.0]
-        # side normals
-        apex = self.vertices[1]
-        for i in range(2, self.nsegments + 3):
-            p1 = self.vertices[i]
-            p2 = self.vertices[i - 1]
-            v1 = p1 - apex
-            v2 = p2 - apex
-            normal = np.cross(v1, v2)
-            normal /= np.linalg.norm(normal) + 1e-8
-            normals[i] = normal
-
-        normals[2] += normals[self.nsegments + 2]
-        normals[self.nsegments + 2] = normals[2]
-        # average normals for base vertices
-        for i in range(2, self.nsegments + 3):
-            # normals[i] += normals[0]
-            normals[i] /= np.linalg.norm(normals[i]) + 1e-8
+        # side normals: ring vertex k + 1 takes the normal of the face (apex, k + 1, k),
+        # the first one that of the last face, as the seam vertices coincide
+        edges = self.vertices[2:] - self.vertices[1]
+        faces = np.cross(edges[1:], edges[:-1])
+        faces /= np.sqrt(np.einsum("ij,ij->i", faces, faces))[:, None] + 1e-8
+        normals[3:] = faces
+        normals[2] = faces[-1]
         return normals
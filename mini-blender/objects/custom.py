@@ -3,22 +3,28 @@ import numpy as np
 import OpenGL.GL as GL
 import pyassimp
 
-from lib.shader import Shader
+from lib.shader import SHADER_REGISTRY
 from lib.buffer import UManager, VAO
-from lib.config import (
-    PROJECT_ROOT,
-    GLOBAL_I_LIGHT,
-    GLOBAL_K_MATERIALS,
-    GLOBAL_SHININESS,
-    GLOBAL_LIGHT_POS,
-)
+from lib.state import GL_STATE
+from lib.bvh import TriangleBVH
+from lib.config import PROJECT_ROOT
+from lib.transform import normal_matrix
 
 from objects.colors import Color
 from objects.abstract import Drawable
 
 
 class CustomModel(Drawable):
-    def __init__(self, shader_type="phong_texture", model_path=None):
+    # position, normal, texcoord, color locations of phong_texture
+    FORMATS = {0: "float3", 1: "float3", 2: "float2", 3: "float3"}
+    COMPACT_FORMATS = {0: "half4", 1: "int_2_10_10_10_rev", 2: "float2", 3: "ubyte4"}
+    instanceable = False  # one VAO per mesh, drawn through its own loop
+
+    def __init__(self, shader_type="phong_texture", model_path=None, culling=False):
+        """
+        - culling: cull back faces, only for closed meshes with consistent winding;
+          imported files often have neither, so both faces are drawn by default
+        """
         if model_path is None:
             raise ValueError("Model path must be provided")
         model_path = (
@@ -32,29 +38,42 @@ class CustomModel(Drawable):
             raise RuntimeError(f"No meshes found in model: {model_path}")
 
         self.normalize_model(center=True, scale=True)
+        self._picking_bvh = None
+        self.culling = culling
         self.load_textures(model_path)
 
         for mesh in self.meshes:
             mesh["vao"] = VAO()
-            mesh["shader"] = Shader(shader_type)
+            mesh["shader"] = SHADER_REGISTRY.acquire(shader_type)
             mesh["uma"] = UManager(mesh["shader"])
             mesh["texture_id"] = None
 
-    def setup(self):
+    def picking_bvh(self):
+        """One triangle BVH over all meshes, built on the first pick"""
+        if self._picking_bvh is None:
+            vertices = [mesh["vertices"].reshape(-1, 3) for mesh in self.meshes]
+            offsets = np.cumsum([0] + [len(v) for v in vertices[:-1]])
+            triangles = [
+                (mesh["indices"] if mesh["indices"] is not None else np.arange(len(v))).reshape(-1, 3) + offset
+                for mesh, v, offset in zip(self.meshes, vertices, offsets)
+            ]
+            self._picking_bvh = TriangleBVH(np.vstack(vertices), np.vstack(triangles))
+        return self._picking_bvh
+
+    def setup(self, compact=False):
         for mesh in self.meshes:
-            self.setup_mesh(mesh)
+            self.setup_mesh(mesh, compact)
+        self.compute_bounds(np.vstack([mesh["vertices"] for mesh in self.meshes]))
         return self
 
-    def setup_mesh(self, mesh):
+    def setup_mesh(self, mesh, compact=False):
         # fmt: off
-        mesh["vao"].add_vbo(0, mesh["vertices"], ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None)
-        mesh["vao"].add_vbo(1, mesh["normals"], ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None)
-        mesh["vao"].add_vbo(3, mesh["colors"], ncomponents=3, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None)
-
-        GL.glUseProgram(mesh["shader"].render_idx)
-
+        attributes = {0: mesh["vertices"], 1: mesh["normals"], 3: mesh["colors"]}
         if "texcoords" in mesh and mesh["texcoords"] is not None:
-            mesh["vao"].add_vbo(2, mesh["texcoords"], ncomponents=2, dtype=GL.GL_FLOAT, normalized=False, stride=0, offset=None)
+            attributes[2] = mesh["texcoords"]
+        mesh["vao"].add_interleaved(attributes, self.COMPACT_FORMATS if compact else self.FORMATS)
+
+        mesh["shader"].use()
 
         if mesh["indices"] is not None:
             mesh["vao"].add_ebo(mesh["indices"])
@@ -68,41 +87,49 @@ class CustomModel(Drawable):
 
 
         phong_factor = 0.1
-
-        mesh["uma"].upload_uniform_matrix3fv(GLOBAL_I_LIGHT, "I_light", False)
-        mesh["uma"].upload_uniform_vector3fv(GLOBAL_LIGHT_POS, "light_pos")
-        mesh["uma"].upload_uniform_matrix3fv(GLOBAL_K_MATERIALS, "K_materials", False)
-        mesh["uma"].upload_uniform_scalar1f(GLOBAL_SHININESS, "shininess")
         mesh["uma"].upload_uniform_scalar1f(phong_factor, "phong_factor")
         return self
 
     def draw(self, projection, view, model):
-        modelview = view @ model
-
+        normals_to_eye = normal_matrix(view @ model)  # same for every mesh of the model
+        GL_STATE.set_cull_face(self.culling)
         for mesh in self.meshes:
-            GL.glUseProgram(mesh["shader"].render_idx)
-
-            mesh["uma"].upload_uniform_matrix4fv(projection, "projection", True)
-            mesh["uma"].upload_uniform_matrix4fv(modelview, "modelview", True)
-            light_pos_eye4 = view @ np.array(
-                [GLOBAL_LIGHT_POS[0], GLOBAL_LIGHT_POS[1], GLOBAL_LIGHT_POS[2], 1.0],
-                dtype=np.float32,
+            mesh["shader"].use()
+            mesh["uma"].upload_uniform_scalar1i(0, "instanced")
+            mesh["uma"].upload_uniform_matrix4fv(model, "model", True)
+            mesh["uma"].upload_uniform_matrix3fv(normals_to_eye, "normal_matrix", True)
+            mesh["uma"].bind_textures()  # units are shared with every other textured model
+            self.draw_mesh(mesh)
+
+    def draw_ids(self, uma, view, models, first_id):
+        uma.upload_uniform_scalar1i(0, "instanced")
+        GL_STATE.set_cull_face(self.culling)
+        for object_id, model in enumerate(models, first_id):
+            uma.upload_uniform_matrix4fv(model, "model", True)
+            uma.upload_uniform_scalar1i(object_id, "first_id")
+            for mesh in self.meshes:
+                self.draw_mesh(mesh)
+
+    @staticmethod
+    def draw_mesh(mesh):
+        mesh["vao"].activate()
+        if mesh["vao"].ebo is not None:
+            GL.glDrawElements(
+                GL.GL_TRIANGLES, int(mesh["indices"].size), GL.GL_UNSIGNED_INT, None
             )
-            mesh["uma"].upload_uniform_vector3fv(light_pos_eye4[:3], "light_pos")
+        else:
+            GL.glDrawArrays(GL.GL_TRIANGLES, 0, int(mesh["vertices"].shape[0]))
 
-            mesh["vao"].activate()
-            if mesh["vao"].ebo is not None:
-                GL.glDrawElements(
-                    GL.GL_TRIANGLES, int(mesh["indices"].size), GL.GL_UNSIGNED_INT, None
-                )
-            else:
-                GL.glDrawArrays(GL.GL_TRIANGLES, 0, int(mesh["vertices"].shape[0]))
-            mesh["vao"].deactivate()
+    def state_key(self):
+        mesh = self.meshes[0]  # the rest of the meshes follow it in draw()
+        textures = mesh["uma"].textures
+        texture = textures[min(textures)]["id"] if textures else 0
+        return (mesh["shader"].render_idx, mesh["vao"].vao, self.culling, texture)
 
     def destroy(self):
         for mesh in self.meshes:
             mesh["vao"].destroy()
-            mesh["shader"].destroy()
+            SHADER_REGISTRY.release(mesh["shader"])
 
     def load_model(self, model_path):
         meshes = []
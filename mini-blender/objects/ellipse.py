@@ -15,6 +15,9 @@ class Ellipse(Drawable):
         - nsegments: number of segments to approximate the ellipse
         """
         super().__init__(shader_type)
+        self.use_ebo = False
+        self.primitive = GL.GL_TRIANGLE_FAN
+        self.count = nsegments + 1
         self.major_length = major_length
         self.minor_length = minor_length
         self.nsegments = nsegments
@@ -27,11 +30,6 @@ class Ellipse(Drawable):
         self.normals = np.array([[0, 0, 1]], dtype=np.float32)
         self.normals = self.normals / np.linalg.norm(self.normals, axis=1, keepdims=True)
 
-    def draw(self, projection, view, model):
-        super().draw(
-            projection, view, model, False, GL.GL_TRIANGLE_FAN, 0, self.nsegments + 1
-        )
-
     def _generate_vertices(self):
         theta = np.linspace(0, 2 * np.pi, self.nsegments, endpoint=False)
         x = self.major_length * np.cos(theta)
@@ -1,7 +1,7 @@
 import ctypes
 import sympy as sp
 import numpy as np
-import OpenGL.GL as GL
+from lib.mesh import grid_indices
 from objects.colors import Color
 from objects.abstract import Drawable
 
@@ -27,10 +27,13 @@ class Equation(Drawable):
         if func is None:
             raise ValueError("Function 'func' must be provided")
         self.func = self.string_to_lambda(func)
+        self.gradient = self.string_to_gradient(func)
         self.step = step
         self.limit_x = limit_x
         self.limit_y = limit_y
         self.culling = False
+        self.valid = None  # (num_x, num_y) mask of the grid points with a finite z, the ones kept as vertices
+        self.grid = None  # sparse float32 (num_x, 1) x and (1, num_y) y axes the surface and its gradient are evaluated on
 
         self.vertices = self._generate_vertices()
         self.indices = self._generate_indices()
@@ -40,52 +43,126 @@ class Equation(Drawable):
         # for i in range(self.vertices.shape[0]):
         #     self.colors[i] = Color.all_colors[i % len(Color.all_colors)]
 
-    def draw(self, projection, view, model):
-        super().draw(projection, view, model, True, GL.GL_TRIANGLE_STRIP)
+    def update(self, func=None, step=None, limit_x=None, limit_y=None):
+        """Re-evaluate the surface and rewrite the existing buffers instead of building a new Drawable"""
+        if func is not None:
+            self.func = self.string_to_lambda(func)
+            self.gradient = self.string_to_gradient(func)
+        self.step = step if step is not None else self.step
+        self.limit_x = limit_x if limit_x is not None else self.limit_x
+        self.limit_y = limit_y if limit_y is not None else self.limit_y
+
+        self.vertices = self._generate_vertices()
+        self.indices = self._generate_indices()
+        self.normals = self._generate_normals()
+        self.colors = np.tile([Color.CYAN], (self.vertices.shape[0], 1)).astype(np.float32)
+
+        # same counts update in place, a new sampling or mask resizes the storage
+        self.vao.update_interleaved({0: self.vertices, 1: self.colors, 2: self.normals}, replace=True)
+        self.vao.update_ebo(self.indices, replace=True)
+        self.compute_bounds(self.vertices)
+        return self
 
     def _generate_vertices(self):
         # fmt: off
-        vertices = []
-        for x in np.arange(self.limit_x[0], self.limit_x[1], self.step):
-            for y in np.arange(self.limit_y[0], self.limit_y[1], self.step):
-                z = self.func(x, y)
-                vertices.append([x, y, z])
-
-        return np.array(vertices, dtype=np.float32)
+        xs = np.arange(self.limit_x[0], self.limit_x[1], self.step, dtype=np.float32)
+        ys = np.arange(self.limit_y[0], self.limit_y[1], self.step, dtype=np.float32)
+        # x major, vertex i * len(ys) + j at (xs[i], ys[j]); sparse, so a term in one variable is evaluated once per row / column
+        self.grid = x, y = np.meshgrid(xs, ys, indexing="ij", sparse=True)
+        shape = (len(xs), len(ys))
+
+        # one call over the whole grid, a constant expression comes back as a scalar
+        with np.errstate(all="ignore"):
+            z = np.broadcast_to(np.asarray(self.func(x, y)), shape)
+        if np.iscomplexobj(z):  # e.g. sqrt(-1) written as I**..., only the real points are drawn
+            self.valid = np.isfinite(z) & (z.imag == 0)
+            z = z.real
+        else:
+            self.valid = np.isfinite(z)
+        if not self.valid.any():
+            raise ValueError("Function has no finite value on the sampled range")
+
+        rows = slice(None) if self.valid.all() else self.valid.ravel()
+        vertices = np.empty((np.count_nonzero(self.valid), 3), dtype=np.float32)
+        for column, values in enumerate((x, y, z)):
+            vertices[:, column] = np.broadcast_to(values, shape).reshape(-1)[rows]
+        return vertices
 
     def _generate_indices(self):
         # fmt: off
-        indices = []
-
-        num_x = int((self.limit_x[1] - self.limit_x[0]) / self.step)
-        num_y = int((self.limit_y[1] - self.limit_y[0]) / self.step)
-        for i in range(num_y - 1):
-            if i % 2 == 0:
-                for j in range(num_x):
-                    indices.append(j + i * num_x)
-                    indices.append(j + (i + 1) * num_x)
-            else:
-                for j in reversed(range(num_x)):
-                    indices.append(j + (i + 1) * num_x)
-                    indices.append(j + i * num_x)
+        indices = grid_indices(*self.valid.shape)
+        if self.valid.all():
+            return indices
+
+        # drop the triangles touching a masked grid point, the two of each quad being
+        # (curr1, curr2, next2) and (next1, curr1, next2) as laid out by grid_indices
+        v = self.valid
+        curr1, curr2, next1, next2 = v[:-1, :-1], v[1:, :-1], v[:-1, 1:], v[1:, 1:]
+        keep = np.stack((curr1 & curr2 & next2, next1 & curr1 & next2), axis=-1).ravel()
+        triangles = indices.reshape(-1, 3)[keep]
 
-        return np.array(indices, dtype=np.uint32)
+        # renumber onto the kept vertices
+        renumber = np.cumsum(v.ravel(), dtype=np.uint32) - np.uint32(1)
+        return renumber[triangles].ravel()
 
     def _generate_normals(self):
-        v = self.vertices.astype(np.float32, copy=False)
-        n = np.linalg.norm(v, axis=1, keepdims=True)
-        n = np.maximum(n, 1e-12)
-        return (v / n).astype(np.float32, copy=False)
+        # fmt: off
+        """
+        normalize(-∂f/∂x, -∂f/∂y, 1) per vertex, the gradient evaluated on the sparse grid of the
+        vertices and kept in float32, central differences where it is not finite
+        """
+        x, y = self.grid
+        count = len(self.vertices)
+        keep = (lambda values: values.reshape(-1)) if self.valid.all() else (lambda values: values[self.valid])
+        fx = fy = None
+        if self.gradient is not None:
+            try:
+                with np.errstate(all="ignore"):
+                    fx, fy = (keep(np.broadcast_to(np.real(d(x, y)), self.valid.shape)).astype(np.float32, copy=False)
+                              for d in self.gradient)
+            except Exception:  # e.g. an unevaluated Derivative of a function sympy cannot differentiate
+                fx = fy = None
+
+        # central differences over the sampled grid, one-sided at its borders
+        if fx is None or not (np.isfinite(fx).all() and np.isfinite(fy).all()):
+            z = np.full(self.valid.shape, np.nan, dtype=np.float32)
+            z[self.valid] = self.vertices[:, 2]
+            if min(z.shape) > 1:
+                dx, dy = (keep(d) for d in np.gradient(z, np.float32(self.step)))
+            else:
+                dx = dy = np.zeros(count, dtype=np.float32)
+            if fx is None:
+                fx, fy = dx, dy
+            else:
+                fx, fy = np.where(np.isfinite(fx), fx, dx), np.where(np.isfinite(fy), fy, dy)
+
+        # 1 / |(-fx, -fy, 1)| in place, then each column written once
+        normals = np.empty((count, 3), dtype=np.float32)
+        with np.errstate(all="ignore"):
+            scale = fx * fx
+            scale += fy * fy
+            scale += 1
+            np.reciprocal(np.sqrt(scale, out=scale), out=scale)
+            # NaN next to a masked point, 0 once the slope overflows float32: a vertical tangent
+            degenerate = ~(scale > 0)
+            normals[:, 2] = scale
+            np.multiply(fx, np.negative(scale, out=scale), out=normals[:, 0])
+            np.multiply(fy, scale, out=normals[:, 1])
+        if degenerate.any():
+            normals[degenerate] = (0.0, 0.0, 1.0)
+        return normals
 
     @staticmethod
-    def string_to_lambda(equation_str, variables=["x", "y"]):
-        symbols = sp.symbols(" ".join(variables))
-
+    def parse_expression(equation_str):
         try:
-            expr = sp.sympify(equation_str)
+            return sp.sympify(equation_str)
         except (sp.SympifyError, SyntaxError) as e:
             raise ValueError(f"Invalid equation: {equation_str}. Error: {e}")
 
+    @staticmethod
+    def string_to_lambda(equation_str, variables=["x", "y"]):
+        symbols = sp.symbols(" ".join(variables))
+        expr = Equation.parse_expression(equation_str)
         func = sp.lambdify(symbols, expr, modules=["numpy"])
 
         def wrapper(*args):
@@ -95,3 +172,13 @@ class Equation(Drawable):
             return result
 
         return wrapper
+
+    @staticmethod
+    def string_to_gradient(equation_str, variables=["x", "y"]):
+        """(∂f/∂x, ∂f/∂y) lambdified on numpy like string_to_lambda, None if sympy cannot differentiate"""
+        symbols = sp.symbols(" ".join(variables))
+        expr = Equation.parse_expression(equation_str)
+        try:
+            return [sp.lambdify(symbols, sp.diff(expr, symbol), modules=["numpy"]) for symbol in symbols]
+        except Exception:
+            return None
@@ -8,6 +8,9 @@ class Hexagon(Drawable):
     def __init__(self, shader_type="phong"):
         # fmt: off
         super().__init__(shader_type)
+        self.use_ebo = False
+        self.primitive = GL.GL_TRIANGLE_FAN
+        self.count = 6
         self.culling = False
         angles = np.linspace(0, 2 * np.pi, 6, endpoint=False) + np.pi / 2
         self.vertices = np.array([[np.cos(a), np.sin(a), 0] for a in angles], dtype=np.float32)
@@ -21,6 +24,3 @@ class Hexagon(Drawable):
         self.colors = np.zeros((self.vertices.shape[0], 3), dtype=np.float32)
         for i in range(self.vertices.shape[0]):
             self.colors[i] = Color.all_colors[i % len(Color.all_colors)]
-
-    def draw(self, projection, view, model):
-        super().draw(projection, view, model, False, GL.GL_TRIANGLE_FAN, 0, 6)
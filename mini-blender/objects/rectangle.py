@@ -8,6 +8,9 @@ class Rectangle(Drawable):
     def __init__(self, shader_type="phong"):
         # fmt: off
         super().__init__(shader_type)
+        self.use_ebo = False
+        self.primitive = GL.GL_TRIANGLE_FAN
+        self.count = 4
         self.culling = False
 
         self.vertices = np.array([[-1, -1, +0], 
@@ -23,6 +26,3 @@ class Rectangle(Drawable):
         self.colors = np.zeros((self.vertices.shape[0], 3), dtype=np.float32)
         for i in range(self.vertices.shape[0]):
             self.colors[i] = Color.all_colors[i % len(Color.all_colors)]
-
-    def draw(self, projection, view, model):
-        super().draw(projection, view, model, False, GL.GL_TRIANGLE_FAN, 0, 4)
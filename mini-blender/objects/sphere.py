@@ -1,4 +1,5 @@
 import numpy as np
+from lib.mesh import fan_indices, grid_indices, palette_colors, parametric_grid
 from objects.colors import Color
 from objects.abstract import Drawable
 
@@ -16,12 +17,9 @@ class Sphere(Drawable):
         self.nsegments = nsegments
 
         self.vertices = self._generate_vertices()
-        self.vertices_map = np.arange(2, nsegments*(int(nsegments/2)-1)+2).reshape(nsegments, int(nsegments/2)-1)
         self.indices = self._generate_indices()
         self.normals = self._generate_normals()
-        self.colors = np.zeros((self.vertices.shape[0], 3), dtype=np.float32)
-        for i in range(self.vertices.shape[0]):
-            self.colors[i] = Color.all_colors[i % len(Color.all_colors)]
+        self.colors = palette_colors(len(self.vertices), Color.all_colors)
 
     def _generate_vertices(self):
         # fmt: off
@@ -30,46 +28,29 @@ class Sphere(Drawable):
         z = (r·cos(φ))·sin(θ)
         y = r·sin(φ)
         """
-        vertices = []
-
         phi = np.linspace(0, np.pi, int(self.nsegments/2), endpoint=False)[1:] # exclude the north pole
         theta = np.linspace(0, 2*np.pi, self.nsegments, endpoint=False)
 
-        for i in range(len(theta)):
-            for j in range(len(phi)):
-                vertices.append([self.radius * np.sin(phi[j]) * np.cos(theta[i]),
-                                 self.radius * np.cos(phi[j]),
-                                 self.radius * np.sin(phi[j]) * np.sin(theta[i])])
-
-        north_pole = np.array([[0, self.radius, 0]], dtype=np.float32)
-        south_pole = np.array([[0, -self.radius, 0]], dtype=np.float32)
-            
-        return np.vstack((north_pole, south_pole, vertices), dtype = np.float32)
+        # one ring of constant θ per grid row, the two poles first
+        rings = parametric_grid(lambda t, p: (self.radius * np.sin(p) * np.cos(t),
+                                              self.radius * np.cos(p),
+                                              self.radius * np.sin(p) * np.sin(t)), theta, phi)
+        poles = np.array([[0, self.radius, 0], [0, -self.radius, 0]], dtype=np.float32)
+        return np.vstack((poles, rings), dtype = np.float32)
 
     def _generate_indices(self):
         # fmt: off
-        indices = []
-
-        # middle quads
-        for i in range(self.nsegments):
-            for j in range(0, int(self.nsegments/2)-2):
-                curr1 = self.vertices_map[i, j]
-                curr2 = self.vertices_map[(i+1) % self.nsegments, j]
-                next1 = self.vertices_map[i, j+1]
-                next2 = self.vertices_map[(i+1) % self.nsegments, j+1]
-
-                indices.extend([curr1, curr2, next2])
-                indices.extend([next1, curr1, next2])
-
-        # top and bottom cap
-        for i in range(self.nsegments):
-            indices.extend([0,self.vertices_map[(i+1) % self.nsegments, 0] , self.vertices_map[i, 0]])
-            indices.extend([1, self.vertices_map[i, -1], self.vertices_map[(i+1) % self.nsegments, -1]])
+        nphi = int(self.nsegments/2)-1
+        middle = grid_indices(self.nsegments, nphi, wrap_rows=True, offset=2)
 
-        return np.array(indices, dtype=np.uint32)
+        # top and bottom cap, the fans interleaved triangle by triangle
+        first = 2 + np.arange(self.nsegments)*nphi
+        top = fan_indices(0, first, flip=True)
+        bottom = fan_indices(1, first + nphi-1)
+        return np.concatenate((middle, np.hstack((top, bottom)).reshape(-1)))
 
     def _generate_normals(self):
         v = self.vertices.astype(np.float32, copy=False)
-        n = np.linalg.norm(v, axis=1, keepdims=True)
+        n = np.sqrt(np.einsum("ij,ij->i", v, v))[:, None]  # row norms without linalg.norm's temporaries
         n = np.maximum(n, 1e-12)
         return (v / n).astype(np.float32, copy=False)
@@ -15,6 +15,9 @@ class Star(Drawable):
         - outer_radius: radius of the outer vertices
         """
         super().__init__(shader_type)
+        self.use_ebo = False
+        self.primitive = GL.GL_TRIANGLE_FAN
+        self.count = nstar * 2 + 2
         self.culling = False
 
         self.nstar = nstar
@@ -28,11 +31,6 @@ class Star(Drawable):
         for i in range(self.vertices.shape[0]):
             self.colors[i] = Color.all_colors[i % len(Color.all_colors)]
 
-    def draw(self, projection, view, model):
-        super().draw(
-            projection, view, model, False, GL.GL_TRIANGLE_FAN, 0, self.nstar * 2 + 2
-        )
-
     def _generate_vertices(self):
         # fmt: off
         theta = np.linspace(np.pi / 2, np.pi / 2 + 2 * np.pi, self.nstar * 2, endpoint=False)
@@ -26,10 +26,3 @@ class Tetrahedron(Drawable):
         self.colors = np.zeros((self.vertices.shape[0], 3), dtype=np.float32)
         for i in range(self.vertices.shape[0]):
             self.colors[i] = Color.all_colors[i % len(Color.all_colors)]
-
-    def draw(self, projection, view, model):
-        super().draw(
-            projection,
-            view,
-            model,
-        )
@@ -13,6 +13,9 @@ class Trapezoid(Drawable):
         - height: height of the trapezoid
         """
         super().__init__(shader_type)
+        self.use_ebo = False
+        self.primitive = GL.GL_TRIANGLE_FAN
+        self.count = 4
         self.culling = False
 
         self.vertices = np.array([[-base_length/2, -height/2, +0], 
@@ -28,6 +31,3 @@ class Trapezoid(Drawable):
         self.colors = np.zeros((self.vertices.shape[0], 3), dtype=np.float32)
         for i in range(self.vertices.shape[0]):
             self.colors[i] = Color.all_colors[i % len(Color.all_colors)]
-
-    def draw(self, projection, view, model):
-        super().draw(projection, view, model, False, GL.GL_TRIANGLE_FAN, 0, 4)
@@ -8,6 +8,9 @@ class Triangle(Drawable):
     def __init__(self, shader_type="phong"):
         # fmt: off
         super().__init__(shader_type)
+        self.use_ebo = False
+        self.primitive = GL.GL_TRIANGLES
+        self.count = 3
         self.culling = False
 
         self.vertices = np.array([[-1, -1, +0], 
@@ -20,6 +23,3 @@ class Triangle(Drawable):
         self.colors = np.zeros((self.vertices.shape[0], 3), dtype=np.float32)
         for i in range(self.vertices.shape[0]):
             self.colors[i] = Color.all_colors[i % len(Color.all_colors)]
-
-    def draw(self, projection, view, model):
-        super().draw(projection, view, model, False, GL.GL_TRIANGLES, 0, 3)
@@ -2,10 +2,22 @@
 #version 330 core
 
 layout(location = 0) in vec3 position;
+layout(location = 4) in mat4 instance_model;  // per instance, read when 'instanced'
 
-uniform mat4 projection, modelview;
+// per-frame camera and light data, written once per frame by the viewer
+layout(std140) uniform FrameData {
+  mat4 projection;
+  mat4 view;
+  vec3 light_pos;  // eye space
+  float shininess;
+  mat3 I_light;
+  mat3 K_materials;
+};
+uniform mat4 model;
+uniform bool instanced;  // matrices come from the instance attributes instead of the uniforms
 
 out vec3 fragment_color;
 void main(){
-    gl_Position = projection * modelview * vec4(position, 1.0);;
+    mat4 M = instanced ? instance_model : model;
+    gl_Position = projection * view * M * vec4(position, 1.0);
 }
@@ -5,12 +5,15 @@ in vec3 normal_interp;  // Surface normal
 in vec3 vertPos;       // Vertex position
 in vec3 colorInterp;
 
-uniform mat3 K_materials;
-uniform mat3 I_light;
-
-uniform int mode;   // Rendering mode
-uniform float shininess; // Shininess
-uniform vec3 light_pos; // Light position
+// per-frame camera and light data, written once per frame by the viewer
+layout(std140) uniform FrameData {
+  mat4 projection;
+  mat4 view;
+  vec3 light_pos;  // eye space
+  float shininess;
+  mat3 I_light;
+  mat3 K_materials;
+};
 out vec4 fragColor;
 
 void main() {
@@ -4,7 +4,20 @@
 layout(location = 0) in vec3 position;
 layout(location = 1) in vec3 color;
 layout(location = 2) in vec3 normal;
-uniform mat4 projection, modelview;
+layout(location = 4) in mat4 instance_model;  // per instance, read when 'instanced'
+layout(location = 8) in mat3 instance_normal_matrix;
+// per-frame camera and light data, written once per frame by the viewer
+layout(std140) uniform FrameData {
+  mat4 projection;
+  mat4 view;
+  vec3 light_pos;  // eye space
+  float shininess;
+  mat3 I_light;
+  mat3 K_materials;
+};
+uniform mat4 model;
+uniform mat3 normal_matrix;  // inverse-transpose of mat3(view * model), computed on the CPU
+uniform bool instanced;  // matrices come from the instance attributes instead of the uniforms
 out vec3 normal_interp;
 out vec3 vertPos;
 out vec3 colorInterp;
@@ -13,11 +26,11 @@ out vec3 colorInterp;
 
 void main(){
   colorInterp = color;
+  mat4 modelview = view * (instanced ? instance_model : model);
   vec4 vertPos4 = modelview * vec4(position, 1.0);
   vertPos = vec3(vertPos4) / vertPos4.w;
 
-  mat4 normal_matrix = transpose(inverse(modelview));
-  normal_interp = vec3(normal_matrix * vec4(normal, 0.0));
+  normal_interp = (instanced ? instance_normal_matrix : normal_matrix) * normal;
 
   gl_Position = projection * vertPos4;
 }
@@ -6,12 +6,17 @@ in vec3 vert_pos;       // Vertex position
 in vec3 color_interp;
 in vec2 texcoord_interp;
 
-uniform mat3 K_materials;
-uniform mat3 I_light;
+// per-frame camera and light data, written once per frame by the viewer
+layout(std140) uniform FrameData {
+  mat4 projection;
+  mat4 view;
+  vec3 light_pos;  // eye space
+  float shininess;
+  mat3 I_light;
+  mat3 K_materials;
+};
 
 uniform float phong_factor; // Shininess
-uniform float shininess; // Shininess
-uniform vec3 light_pos; // Light position
 out vec4 fragColor;
 
 
@@ -5,8 +5,21 @@ layout(location = 0) in vec3 vertex;
 layout(location = 1) in vec3 normal;
 layout(location = 2) in vec2 texcoord;
 layout(location = 3) in vec3 color;
+layout(location = 4) in mat4 instance_model;  // per instance, read when 'instanced'
+layout(location = 8) in mat3 instance_normal_matrix;
 
-uniform mat4 projection, modelview;
+// per-frame camera and light data, written once per frame by the viewer
+layout(std140) uniform FrameData {
+  mat4 projection;
+  mat4 view;
+  vec3 light_pos;  // eye space
+  float shininess;
+  mat3 I_light;
+  mat3 K_materials;
+};
+uniform mat4 model;
+uniform mat3 normal_matrix;  // inverse-transpose of mat3(view * model), computed on the CPU
+uniform bool instanced;  // matrices come from the instance attributes instead of the uniforms
 out vec3 normal_interp;
 out vec3 color_interp;
 out vec3 vert_pos;
@@ -14,11 +27,11 @@ out vec2 texcoord_interp;
 
 void main(){
   color_interp = color;
+  mat4 modelview = view * (instanced ? instance_model : model);
   vec4 vert_pos4 = modelview * vec4(vertex, 1.0);
   vert_pos = vec3(vert_pos4) / vert_pos4.w;
 
-  mat4 normal_matrix = transpose(inverse(modelview));
-  normal_interp = vec3(normal_matrix * vec4(normal, 0.0));
+  normal_interp = (instanced ? instance_normal_matrix : normal_matrix) * normal;
 
   texcoord_interp = texcoord;
   gl_Position = projection * vert_pos4;
@@ -0,0 +1,8 @@
+#version 330 core
+
+flat in uint object_id;
+out uint out_id;
+
+void main() {
+    out_id = object_id;
+}